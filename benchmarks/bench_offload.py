@@ -0,0 +1,95 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from offload import Offload, api_rows, from_row, site_rows
+from parsers import available_parsers
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def make_api_page(page_no, size=10):
+    # API 응답 Items 형식의 합성 데이터 (옵션 3개, 페이지마다 다른 가격/종료 시간)
+    end = datetime(2024, 10, 10, 21, 0, 0)
+    items = []
+    for i in range(size):
+        n = page_no * size + i
+        price = 10000 + n * 37 % 5000
+        items.append({
+            "Name": f"고대 목걸이 {n % 7}", "Grade": "고대", "Tier": 4, "Level": 0, "Icon": "https://cdn/acc_215.png",
+            "GradeQuality": 70 + n % 30,
+            "AuctionInfo": {"StartPrice": price - 100, "BuyPrice": price, "BidPrice": price - 100, "BidStartPrice": price - 100,
+                            "EndDate": (end + timedelta(minutes=n)).isoformat() + ".853", "TradeAllowCount": n % 3},
+            "Options": [
+                {"Type": "ACCESSORY_UPGRADE", "OptionName": "추가 피해", "Value": round(0.6 + n % 3, 1), "IsValuePercentage": True},
+                {"Type": "ACCESSORY_UPGRADE", "OptionName": "적에게 주는 피해 증가", "Value": 2.0, "IsValuePercentage": True},
+                {"Type": "ARK_PASSIVE", "OptionName": "깨달음", "Value": 13.0, "IsValuePercentage": False},
+            ],
+        })
+    return page_no, items
+
+
+def run(workers, parser, htmls, api_conditions, now):
+    # workers=0은 메인 프로세스에서 바로 변환 (offload를 쓰지 않을 때와 같음)
+    started = time.perf_counter()
+    if workers == 0:
+        site = [site_rows(parser, html, now) for html in htmls]
+        api = [api_rows(pages) for pages in api_conditions]
+    else:
+        offload = Offload(workers, parser)
+        offload.start()
+        started = time.perf_counter()
+        site = [future.result() for future in [offload.submit_site(html, now) for html in htmls]]
+        api = [future.result() for future in [offload.submit_api(pages) for pages in api_conditions]]
+        offload.close()
+    # 결과를 이 프로세스의 Listing으로 되돌리는 비용까지 포함
+    listings = sum(len([from_row(row) for row in rows]) for rows in site + api)
+    return time.perf_counter() - started, site, api, listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사이트 HTML 파싱/API 응답 변환을 변환 프로세스 수별로 처리량 비교")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--pages", type=int, default=100, help="fixture HTML을 몇 번 반복해서 넘길지")
+    parser.add_argument("--conditions", type=int, default=200, help="합성 API 응답 조건 수 (조건당 5페이지)")
+    parser.add_argument("--parser", default="auto", choices=["auto"] + available_parsers())
+    parser.add_argument("fixtures", nargs="*", help="HTML 파일 (기본: benchmarks/fixtures/*.html)")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    htmls = []
+    for path in fixtures:
+        with open(path, "r", encoding="utf-8") as f:
+            htmls.append(f.read())
+    htmls = htmls * args.pages
+    api_conditions = [[make_api_page(c * 5 + p) for p in range(5)] for c in range(args.conditions)]
+    # EndDate는 파싱 시각 기준이므로 같은 시각을 넘겨서 결과를 비교
+    now = datetime.now()
+    print(f"[+] 사이트 HTML {len(htmls)}페이지, API 응답 {len(api_conditions)}개 조건 ({len(api_conditions) * 5}페이지), 파서 {args.parser}, CPU {os.cpu_count()}개")
+
+    baseline = None
+    expected = None
+    failed = False
+    for workers in args.workers:
+        elapsed, site, api, listings = run(workers, args.parser, htmls, api_conditions, now)
+        if expected is None:
+            expected = (site, api)
+        same = (site, api) == expected
+        failed = failed or not same
+        baseline = baseline or elapsed
+        pages = len(htmls) + len(api_conditions) * 5
+        print(f"    workers {workers:>2}  {elapsed:7.2f}s  {pages / elapsed:>8,.0f} pages/sec  {listings / elapsed:>10,.0f} listings/sec  "
+              f"x{baseline / elapsed:4.2f}  {'일치' if same else '불일치'}")
+
+    if failed:
+        print("[x] 메인 프로세스 변환 결과와 다른 결과가 있습니다.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
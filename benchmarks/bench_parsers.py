@@ -0,0 +1,60 @@
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import PARSERS, available_parsers
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def bench(parse, html, now, repeat):
+    started = time.perf_counter()
+    rows = 0
+    for _ in range(repeat):
+        rows += len(parse(html, now))
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    parse(html, now)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows / elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="auctionListTable HTML 파서 속도/메모리 비교")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("fixtures", nargs="*", help="HTML 파일 (기본: benchmarks/fixtures/*.html)")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    # EndDate는 파싱 시각 기준이므로 같은 시각을 넘겨서 결과를 비교
+    now = datetime.now()
+    failed = False
+
+    for path in fixtures:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        print(f"[+] {os.path.basename(path)} ({len(html):,} bytes)")
+
+        expected = PARSERS['bs4'](html, now)
+        for name in available_parsers():
+            result = PARSERS[name](html, now)
+            same = result == expected
+            failed = failed or not same
+            rows_per_sec, peak = bench(PARSERS[name], html, now, args.repeat)
+            print(f"    {name:<7} {len(result):>3} rows  {rows_per_sec:>10,.0f} rows/sec  peak {peak / 1024:>8,.1f} KiB  {'일치' if same else '불일치'}")
+
+    if failed:
+        print("[x] bs4 결과와 다른 파서가 있습니다.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import OPTIONS, Listing, make_listing_key, parse_end_ms
+from market import diff_snapshot
+from storage import Storage
+
+
+def make_rows(count):
+    rows = []
+    for i in range(count):
+        rows.append({
+            'price': 10000 + i,
+            'endDate': f"2024-10-{1 + i % 28:02d}T12:{i % 60:02d}:00.000",
+            'itemName': f"고대 목걸이 {i % 7}",
+            'optionInfo': f"추가 피해 - {i % 3}.6%\n깨달음 - 13.0",
+            'tradeAllowCount': i % 3,
+            'gradeQuality': 70 + i % 30,
+            'icon': "https://cdn-lostark.game.onstove.com/efui_iconatlas/acc/acc_215.png",
+            'infos': '{"firstCategory": 200000}',
+            'pageNo': 1 + i // 10,
+            'startPrice': 9000 + i,
+            'bidPrice': 9000 + i,
+            'buyPrice': 10000 + i
+        })
+    return rows
+
+
+def to_listing(row):
+    options = tuple(OPTIONS.intern_text(line) for line in row['optionInfo'].split('\n'))
+    return Listing(row['itemName'], row['gradeQuality'], row['tradeAllowCount'], options, parse_end_ms(row['endDate']), row['price'],
+                   start_price=row['startPrice'], bid_price=row['bidPrice'], icon=row['icon'], page_no=row['pageNo'],
+                   key=make_listing_key(row['itemName'], row['gradeQuality'], row['tradeAllowCount'], row['optionInfo'], row['endDate']))
+
+
+def bench_before(path, condition, rows):
+    # 기존 run.py 방식: 기본 저널 모드에서 한 행마다 INSERT + commit
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''
+    CREATE TABLE items (condition_name TEXT, itemName TEXT, optionInfo TEXT, endDate TEXT, price REAL,
+    tradeAllowCount INTEGER, gradeQuality INTEGER, icon TEXT, infos TEXT, startPrice REAL, bidPrice REAL, buyPrice REAL)
+    ''')
+    started = time.perf_counter()
+    for item in rows:
+        cursor.execute('''
+        INSERT INTO items (condition_name, itemName, optionInfo, endDate, price, tradeAllowCount, gradeQuality, icon, infos, startPrice, bidPrice, buyPrice)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (condition, item['itemName'], item['optionInfo'], item['endDate'], item['price'], item['tradeAllowCount'], item['gradeQuality'], item['icon'], item['infos'], item['startPrice'], item['bidPrice'], item['buyPrice']))
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def bench_after(path, condition, rows):
+    # Storage: WAL + executemany 한 트랜잭션
+    storage = Storage(path)
+    storage.init_schema()
+    listings = [to_listing(row) for row in rows]
+    delta = diff_snapshot({}, {listing.key: listing for listing in listings})
+    started = time.perf_counter()
+    storage.write_delta(condition, delta)
+    elapsed = time.perf_counter() - started
+    storage.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="items 테이블 쓰기 속도 비교")
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        before = bench_before(os.path.join(tmp, "before.db"), "bench", rows)
+        after = bench_after(os.path.join(tmp, "after.db"), "bench", rows)
+
+    print(f"[+] 행 수: {len(rows)}")
+    print(f"[+] 기존 (행 단위 commit): {before:.3f}초, {len(rows) / before:,.0f} rows/sec")
+    print(f"[+] Storage (WAL + executemany): {after:.3f}초, {len(rows) / after:,.0f} rows/sec")
+    print(f"[+] {before / after:.1f}배")
+
+
+if __name__ == '__main__':
+    main()
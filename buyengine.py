@@ -0,0 +1,412 @@
+import json
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import METRICS
+from replay import RecordingAdapter
+
+# KST 시간대 정의
+KST = timezone(timedelta(hours=9))
+
+FORM_PATH = "/SecondPassword/GetSecondPasswordForm?type=auction&status=1"
+BUY_PATH = "/Auction/SetAuctionBuy"
+PC_NAME = "%EC%86%8C%EC%84%9C%EB%9F%AC%EB%8B%AC%EC%9D%B4"
+
+# 미리 받아둔 2차 비밀번호 키패드의 유효 시간(초)
+# 사이트가 세션당 마지막으로 발급한 키패드만 인정하므로 미리 받아두는 키패드는 항상 1개
+DEFAULT_TOKEN_TTL = 60.0
+
+BUTTON_RE = re.compile(r'<button\b([^>]*)>(.*?)</button>', re.S | re.I)
+ATTR_RE = re.compile(r'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+RANDOMPADKEY_RE = re.compile(r'data-randompadkey\s*=\s*["\']([^"\']+)["\']')
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def attributes(text):
+    return {name.lower(): double or single for name, double, single in ATTR_RE.findall(text)}
+
+
+def extract_keypad_fast(html):
+    # 정규식으로 키패드 버튼(표시 숫자 -> 전송 값)과 randompadkey만 뽑아냄
+    mapping = {}
+    randompadkey = None
+    for attr_text, inner in BUTTON_RE.findall(html):
+        if 'btnRandompad' in attr_text:
+            attrs = attributes(attr_text)
+            if attrs.get('name') == 'btnRandompad' and 'value' in attrs:
+                mapping[TAG_RE.sub('', inner).strip()] = attrs['value']
+        elif randompadkey is None and 'data-randompadkey' in attr_text:
+            attrs = attributes(attr_text)
+            if 'button--password-confirm' in attrs.get('class', '').split():
+                randompadkey = attrs.get('data-randompadkey')
+    if randompadkey is None:
+        match = RANDOMPADKEY_RE.search(html)
+        randompadkey = match.group(1) if match else None
+    return mapping, randompadkey
+
+
+def extract_keypad_bs4(html):
+    # 기존 방식 (정규식 추출이 실패했을 때만 사용)
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    mapping = {button.get_text().strip(): button['value'] for button in soup.find_all('button', {'name': 'btnRandompad'})}
+    randompadkey_button = soup.find('button', {'class': 'button--password-confirm'})
+    return mapping, randompadkey_button['data-randompadkey'] if randompadkey_button else None
+
+
+def extract_keypad(html, digits):
+    mapping, randompadkey = extract_keypad_fast(html)
+    if randompadkey is None or any(digit not in mapping for digit in digits):
+        mapping, randompadkey = extract_keypad_bs4(html)
+    return mapping, randompadkey
+
+
+class KeypadToken:
+    def __init__(self, mapping, randompadkey, fetched_at):
+        self.mapping = mapping
+        self.randompadkey = randompadkey
+        self.fetched_at = fetched_at  # time.monotonic()
+
+    def password(self, secondpass):
+        return ''.join(self.mapping[digit] for digit in secondpass)
+
+
+class ConfigCache:
+    # config.json은 파일이 바뀌었을 때만 다시 읽음 (요청마다 stat 한 번)
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.config = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self.mtime:
+            with self.lock:
+                if mtime != self.mtime:
+                    with open(self.path, "rb") as f:
+                        self.config = json.loads(f.read())
+                    self.mtime = mtime
+        return self.config
+
+
+class BuyEngine:
+    # 구매 요청 지연을 줄이기 위해 keep-alive 세션과 미리 받아둔 키패드 토큰을 유지
+    # 백그라운드 스레드가 토큰 1개를 채워두고, ttl이 지나기 전에 버리고 새로 받음
+    def __init__(self, config_path, recorder=None):
+        self.configs = ConfigCache(config_path)
+        self.recorder = recorder
+        self.session = None
+        self.session_headers = None
+        self.token = None  # 미리 받아둔 KeypadToken (마지막으로 발급받은 키패드)
+        self.lock = threading.Lock()
+        # 사이트가 세션당 마지막으로 발급한 키패드만 인정하므로 키패드 발급부터 SetAuctionBuy까지는 한 번에 하나씩
+        self.keypad_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = None
+        self.in_flight = 0
+        self.pool_hits = 0
+        self.pool_misses = 0
+
+    @property
+    def config(self):
+        return self.configs.get()
+
+    @property
+    def site_base(self):
+        return self.config.get("site_base", "https://lostark.game.onstove.com")
+
+    @property
+    def token_ttl(self):
+        return float(self.config.get("buy_token_ttl", DEFAULT_TOKEN_TTL))
+
+    def get_session(self):
+        # 설정의 헤더(쿠키 포함)가 바뀌면 세션과 받아둔 토큰을 새로 만듦
+        config = self.config
+        if self.session is None or self.session_headers != config["headers"]:
+            with self.lock:
+                if self.session is None or self.session_headers != config["headers"]:
+                    session = requests.session()
+                    session.headers = dict(config["headers"])
+                    session.verify = False
+                    adapter = RecordingAdapter(self.recorder, pool_maxsize=8) if self.recorder else HTTPAdapter(pool_maxsize=8)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self.session = session
+                    self.session_headers = config["headers"]
+                    self.token = None
+        return self.session
+
+    def fetch_token(self):
+        with METRICS.span("buy_keypad_fetch"):
+            r = self.get_session().get(f"{self.site_base}{FORM_PATH}")
+            html = r.content.decode()
+        with METRICS.span("buy_keypad_extract"):
+            mapping, randompadkey = extract_keypad(html, self.config["secondpass"])
+        if randompadkey is None:
+            raise ValueError("2차 비밀번호 키패드를 찾을 수 없습니다.")
+        return KeypadToken(mapping, randompadkey, time.monotonic())
+
+    def take_token(self):
+        # 유효 시간이 남은 토큰을 꺼내 쓰고, 없으면 그 자리에서 받음. 꺼낸 토큰은 재사용하지 않음
+        now = time.monotonic()
+        with self.lock:
+            token, self.token = self.token, None
+            if token is not None and now - token.fetched_at < self.token_ttl:
+                self.pool_hits += 1
+                return token, True
+            self.pool_misses += 1
+        return self.fetch_token(), False
+
+    def refill(self):
+        # 만료가 가까운 토큰을 버리고 새로 받음. 토큰이 만료되기 전에 다시 받을 때까지 남은 시간을 반환
+        now = time.monotonic()
+        with self.lock:
+            if self.in_flight:
+                # 구매 요청 중에 새 키패드를 받으면 쓰고 있는 토큰이 무효가 될 수 있으므로 끝날 때까지 미룸
+                return 0.2
+            if self.token is not None and now - self.token.fetched_at >= self.token_ttl * 0.8:
+                self.token = None
+            missing = self.token is None
+        if missing:
+            # 키패드 발급은 구매와 같은 keypad_lock 안에서 하고, 그 사이 구매가 들어왔으면 받지 않고 미룸
+            with self.keypad_lock:
+                with self.lock:
+                    if self.in_flight:
+                        return 0.2
+                token = self.fetch_token()
+                with self.lock:
+                    self.token = token
+        with self.lock:
+            if self.token is None:
+                return self.token_ttl
+            return max(0.5, self.token.fetched_at + self.token_ttl * 0.8 - time.monotonic())
+
+    def refill_loop(self):
+        while not self.stopped:
+            try:
+                wait = self.refill()
+            except Exception as e:
+                print(f"[x] 키패드 토큰 미리 받기 실패: {e}")
+                wait = 5.0
+            self.wakeup.wait(wait)
+            self.wakeup.clear()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.refill_loop, name="buy-token-refill", daemon=True)
+            self.thread.start()
+            print(f"[+] 구매 엔진 시작 (키패드 토큰 유효 {self.token_ttl:.0f}초)")
+
+    def stop(self):
+        self.stopped = True
+        self.wakeup.set()
+
+    def buy(self, itemno, price):
+        # 단계별 소요 시간(ms)과 함께 SetAuctionBuy 응답을 반환
+        timings = {}
+        started = time.perf_counter()
+        with self.lock:
+            self.in_flight += 1
+        try:
+            # 키패드 발급부터 구매 요청까지는 토큰을 미리 받는 스레드와 겹치지 않게 처리 (기다린 시간은 wait로 기록)
+            with self.keypad_lock:
+                timings["wait"] = (time.perf_counter() - started) * 1000
+                r, pooled = self.submit(itemno, price, time.perf_counter(), timings)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            # 쓴 토큰은 구매 요청이 끝난 뒤에 다시 채움
+            self.wakeup.set()
+        timings["total"] = (time.perf_counter() - started) * 1000
+
+        METRICS.inc("buys_total", pooled="yes" if pooled else "no")
+        print(f"[+] 구매 요청 {itemno} ({price}) - 대기 {timings['wait']:.1f}ms, 토큰 {timings['token']:.1f}ms({'미리 받음' if pooled else '즉시 받음'}), "
+              f"요청 {timings['post']:.1f}ms, 총 {timings['total']:.1f}ms, 상태 {r.status_code}")
+        return r, timings
+
+    def submit(self, itemno, price, started, timings):
+        token, pooled = self.take_token()
+        timings["token"] = (time.perf_counter() - started) * 1000
+
+        step = time.perf_counter()
+        password = token.password(self.config["secondpass"])
+        data = (f"productId={itemno}&worldId=1&pcName={PC_NAME}&price={int(float(price))}&pheon=0"
+                f"&password={password}%7C{token.randompadkey}")
+        timings["prepare"] = (time.perf_counter() - step) * 1000
+
+        step = time.perf_counter()
+        with METRICS.span("buy_post", itemno=itemno, pooled=pooled):
+            r = self.get_session().post(f"{self.site_base}{BUY_PATH}", data=data,
+                                        headers={"Content-Type": "application/x-www-form-urlencoded"})
+        timings["post"] = (time.perf_counter() - step) * 1000
+        return r, pooled
+
+    def stats(self):
+        with self.lock:
+            return {"pooled": int(self.token is not None), "pool_hits": self.pool_hits, "pool_misses": self.pool_misses}
+
+
+# SetAuctionBuy JSON 응답에서 성공 여부/메시지를 담는 필드
+SUCCESS_KEYS = ("isSuccess", "IsSuccess", "success", "Success")
+MESSAGE_KEYS = ("message", "Message", "msg")
+
+
+def buy_result(r):
+    # (성공 여부, 메시지). HTTP 200이어도 응답 본문에 성공 표시가 없으면 실패로 봄 (로그인 페이지, 거절 메시지 등)
+    if not r.ok:
+        return False, f"HTTP {r.status_code}"
+    try:
+        body = r.json()
+    except ValueError:
+        return False, "JSON이 아닌 응답"
+    if not isinstance(body, dict):
+        return False, "알 수 없는 응답"
+    message = next((body[key] for key in MESSAGE_KEYS if body.get(key)), None)
+    success = next((body[key] for key in SUCCESS_KEYS if key in body), None)
+    if success is None:
+        return False, message or "성공 여부를 알 수 없는 응답"
+    return bool(success), message
+
+
+# 같은 매물(itemno)에 대한 구매 요청을 하나로 묶는 시간(초)과 상태 조회용으로 요청을 보관하는 시간(초)
+DEFAULT_IDEMPOTENCY_WINDOW = 30.0
+DEFAULT_RETENTION = 3600.0
+
+
+class BuyRequest:
+    def __init__(self, itemno, price):
+        self.id = uuid.uuid4().hex[:16]
+        self.itemno = itemno
+        self.price = price
+        self.status = "queued"  # queued -> running -> done / rejected(사이트가 거절) / failed(요청 오류)
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.http_status = None
+        self.content = None
+        self.timings = {}
+        self.error = None
+        self.duplicates = 0
+        self.done = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self):
+        return {
+            "request_id": self.id,
+            "itemno": self.itemno,
+            "price": self.price,
+            "status": self.status,
+            "http_status": self.http_status,
+            "duplicates": self.duplicates,
+            "queued_ms": round((self.started - self.created) * 1000, 1) if self.started else None,
+            "timings": {name: round(value, 1) for name, value in self.timings.items()},
+            "error": self.error,
+            "response": self.content,
+        }
+
+
+class BuyQueue:
+    # 구매 요청을 대기열에 넣고 요청 ID를 바로 돌려줌
+    # 키패드는 로그인 세션당 마지막 발급분만 유효하므로 구매는 워커 스레드 하나에서 순서대로 실행 (다른 매물끼리도 동시에 진행하지 않음)
+    # 같은 itemno 요청은 진행 중이거나 idempotency_window 안에 성공했으면 기존 요청으로 묶음 (SetAuctionBuy 중복 방지)
+    def __init__(self, engine, idempotency_window=DEFAULT_IDEMPOTENCY_WINDOW, retention=DEFAULT_RETENTION, audit_path=None):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="buy-worker")
+        self.idempotency_window = idempotency_window
+        self.retention = retention
+        self.audit_path = audit_path
+        self.requests = {}  # request_id -> BuyRequest
+        self.by_item = {}   # itemno -> 가장 최근 BuyRequest
+        self.lock = threading.Lock()
+        self.audit_lock = threading.Lock()
+
+    def submit(self, itemno, price):
+        # (BuyRequest, 기존 요청으로 묶였는지)
+        now = time.time()
+        with self.lock:
+            self.prune(now)
+            previous = self.by_item.get(itemno)
+            if previous is not None and (previous.active or (previous.status == "done" and now - previous.finished < self.idempotency_window)):
+                previous.duplicates += 1
+                METRICS.inc("buy_requests_total", result="coalesced")
+                return previous, True
+            buy_request = BuyRequest(itemno, price)
+            self.requests[buy_request.id] = buy_request
+            self.by_item[itemno] = buy_request
+        METRICS.inc("buy_requests_total", result="queued")
+        self.executor.submit(self.run, buy_request)
+        return buy_request, False
+
+    def run(self, buy_request):
+        buy_request.started = time.time()
+        buy_request.status = "running"
+        try:
+            r, timings = self.engine.buy(buy_request.itemno, buy_request.price)
+            buy_request.http_status = r.status_code
+            buy_request.content = r.content.decode("utf-8", "replace")[:2000]
+            buy_request.timings = timings
+            success, message = buy_result(r)
+            # 성공한 구매만 idempotency_window 동안 같은 itemno 요청을 묶고, 거절된 구매는 바로 다시 시도할 수 있음
+            buy_request.status = "done" if success else "rejected"
+            if not success:
+                buy_request.error = message
+                print(f"[x] 구매 요청 {buy_request.itemno} 거절: {message}")
+        except Exception as e:
+            print(f"[x] 구매 요청 {buy_request.itemno} 실패: {e}")
+            print(traceback.format_exc())
+            buy_request.error = str(e)
+            buy_request.status = "failed"
+        finally:
+            buy_request.finished = time.time()
+            buy_request.done.set()
+            METRICS.inc("buy_results_total", status=buy_request.status)
+            self.audit(buy_request)
+
+    def audit(self, buy_request):
+        # 구매 요청마다 지연 시간과 결과를 JSON lines로 남김
+        if not self.audit_path:
+            return
+        entry = buy_request.to_dict()
+        entry["ts"] = datetime.now(KST).isoformat()
+        entry["total_ms"] = round((buy_request.finished - buy_request.created) * 1000, 1)
+        entry["response"] = (buy_request.content or "")[:300]
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.audit_lock:
+            with open(self.audit_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def get(self, request_id):
+        with self.lock:
+            return self.requests.get(request_id)
+
+    def prune(self, now):
+        # 끝난 지 retention 이상 지난 요청은 상태 조회 대상에서 제외
+        expired = [request_id for request_id, buy_request in self.requests.items()
+                   if not buy_request.active and now - buy_request.finished > self.retention]
+        for request_id in expired:
+            buy_request = self.requests.pop(request_id)
+            if self.by_item.get(buy_request.itemno) is buy_request:
+                del self.by_item[buy_request.itemno]
+
+    def stats(self):
+        with self.lock:
+            statuses = Counter(buy_request.status for buy_request in self.requests.values())
+        return dict(statuses, **self.engine.stats())
+
+    def close(self):
+        self.executor.shutdown(wait=True)
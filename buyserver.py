@@ -2,12 +2,10 @@ from flask import Flask, request, jsonify
 from functools import wraps
 import os
 import binascii
-import requests
-import re
-import json
-from bs4 import BeautifulSoup
-import urllib.parse
-from datetime import datetime, timedelta
+import argparse
+from replay import Recorder
+from buyengine import BuyEngine, BuyQueue, DEFAULT_IDEMPOTENCY_WINDOW
+from metrics import METRICS
 
 
 def normalize_path(path):
@@ -23,55 +21,13 @@ app = Flask(__name__)
 # 랜덤 시크릿 키 생성
 SECRET_KEY = binascii.hexlify(os.urandom(64)).decode()
 
-def buy(itemno,price):
-    with open("config.json","rb") as f:
-        config = json.loads(f.read())
+# 녹화 모드(--record)일 때 설정되는 Recorder
+recorder = None
 
-    secondpass = config["secondpass"]
-    s = requests.session()
-    s.headers = config["headers"]
-    s.verify=False
-
-    u = "https://lostark.game.onstove.com/SecondPassword/GetSecondPasswordForm?type=auction&status=1"
-    r = s.get(u)
-
-    html_content = r.content.decode()
-
-    # Parse the HTML content
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # Extract the keypad buttons
-    buttons = soup.find_all('button', {'name': 'btnRandompad'})
-
-    # Create the mapping
-    displayed_to_value = {}
-    for button in buttons:
-        displayed_digit = button.get_text()
-        value = button['value']
-        displayed_to_value[displayed_digit] = value
-
-    # Your actual password
-    actual_password = secondpass
-
-    # Generate the encrypted password
-    encrypted_password = ''
-    for digit in actual_password:
-        encrypted_password += displayed_to_value[digit]
-
-    print('Encrypted Password:', encrypted_password)
-
-    # Extract the randompadkey
-    randompadkey_button = soup.find('button', {'class': 'button--password-confirm'})
-    randompadkey = randompadkey_button['data-randompadkey']
-
-    print('RandomPadKey:', randompadkey)
-
-    u = "https://lostark.game.onstove.com/Auction/SetAuctionBuy"
-    data = f"productId={itemno}&worldId=1&pcName=%EC%86%8C%EC%84%9C%EB%9F%AC%EB%8B%AC%EC%9D%B4&price={int(float(price))}&pheon=0&password={encrypted_password}%7C{randompadkey}"
-    s.headers["Content-Type"] = "application/x-www-form-urlencoded"
-
-    r = s.post(u, data=data)
-    return r.content
+# 설정(config.json)과 세션, 2차 비밀번호 키패드 토큰은 서버가 떠 있는 동안 유지
+engine = None
+# 구매 요청은 워커 풀에서 실행하고, 같은 itemno 요청은 하나로 묶음
+buy_queue = None
 
 @app.route('/buy', methods=['GET'])
 def execute_buy():
@@ -82,12 +38,55 @@ def execute_buy():
         return jsonify({"error": "Missing itemno or price"}), 400
 
     try:
-        # buy 함수 실행
-        return buy(itemno, price), 200
+        # 요청 ID를 바로 돌려주고 구매는 워커에서 진행 (wait=초 를 주면 그 시간까지 결과를 기다림)
+        buy_request, coalesced = buy_queue.submit(itemno, price)
+        wait = request.args.get('wait', type=float)
+        if wait:
+            buy_request.done.wait(min(wait, 30.0))
+        return buy_response(buy_request, coalesced)
     except Exception as e:
         import traceback
         print(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+def buy_response(buy_request, coalesced=False):
+    result = buy_request.to_dict()
+    result["coalesced"] = coalesced
+    result["status_url"] = f"/buy/status/{buy_request.id}"
+    headers = {}
+    if buy_request.timings:
+        # 단계별 소요 시간은 Server-Timing 헤더로 전달
+        headers["Server-Timing"] = ", ".join(f"{name};dur={value:.1f}" for name, value in buy_request.timings.items())
+    return jsonify(result), 202 if buy_request.active else 200, headers
+
+@app.route('/buy/status/<request_id>', methods=['GET'])
+def buy_status(request_id):
+    buy_request = buy_queue.get(request_id)
+    if buy_request is None:
+        return jsonify({"error": "Unknown request_id"}), 404
+    return buy_response(buy_request)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return METRICS.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.route('/buy/stats', methods=['GET'])
+def buy_stats():
+    return jsonify(buy_queue.stats())
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=50000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="lostark auction buy server")
+    parser.add_argument("--record", metavar="PATH", help="사이트 요청과 응답을 JSON lines로 녹화 (replay.py로 재생)")
+    args = parser.parse_args()
+    if args.record:
+        recorder = Recorder(args.record)
+
+    engine = BuyEngine(os.environ.get("LOSTARK_NOTI_CONFIG") or "config.json", recorder)
+    # 첫 구매 요청 전에 세션 연결과 키패드 토큰을 미리 준비
+    engine.start()
+    config = engine.config
+    buy_queue = BuyQueue(engine, idempotency_window=config.get("buy_idempotency_window", DEFAULT_IDEMPOTENCY_WINDOW),
+                         audit_path=config.get("buy_audit_log", "buy_audit.jsonl"))
+
+    # 리로더는 서버를 자식 프로세스로 한 번 더 띄우므로 끔 (세션/키패드 토큰이 두 벌 생김)
+    app.run(debug=True, host='0.0.0.0', port=50000, use_reloader=False, threaded=True)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import json
+
+# conditions.json 항목 중 API로 보내지 않는 로컬 설정
+LOCAL_KEYS = ("PollInterval", "PageMode", "MaxPages")
+
+# 조건을 묶을 때 비교하지 않는 키 (EtcOptions는 공통 부분만 API로 보내고 나머지는 로컬에서 확인)
+GROUP_IGNORED_KEYS = ("EtcOptions", "PageNo")
+
+
+def option_tuple(option):
+    return (option["FirstOption"], option["SecondOption"], option["MinValue"], option["MaxValue"])
+
+
+def site_options(options):
+    # API 옵션 형식 -> 사이트 검색 폼 형식
+    return [
+        {
+            "firstOption": option["FirstOption"],
+            "secondOption": option["SecondOption"],
+            "minValue": option["MinValue"],
+            "maxValue": option["MaxValue"],
+        }
+        for option in options
+    ]
+
+
+class Condition:
+    # conditions.json 항목 하나를 로드 시점에 한 번만 변환해 둔 불변 객체
+    __slots__ = ('name', 'query', 'settings', 'min_quality', 'options', 'group_key', 'site_template')
+
+    def __init__(self, name, raw):
+        raw = dict(raw)
+        settings = {key: raw.pop(key) for key in LOCAL_KEYS if key in raw}
+        set_field = object.__setattr__
+        set_field(self, 'name', name)
+        set_field(self, 'query', raw)  # API 요청 바디 (PageNo만 바꿔서 사용하고 수정하지 않음)
+        set_field(self, 'settings', settings)
+        set_field(self, 'min_quality', raw.get("ItemGradeQuality"))
+        set_field(self, 'options', tuple(option_tuple(option) for option in raw.get("EtcOptions", [])))
+        set_field(self, 'group_key', json.dumps({key: value for key, value in raw.items() if key not in GROUP_IGNORED_KEYS},
+                                                sort_keys=True, ensure_ascii=False))
+        # 사이트 검색 폼에서 아이템마다 달라지는 itemName/pageNo/gradeQuality를 뺀 나머지
+        set_field(self, 'site_template', (
+            {
+                "firstCategory": raw["FirstCategory"],
+                "secondCategory": raw["CategoryCode"],
+                "classNo": "",
+                "itemTier": raw["ItemTier"],
+                "itemGrade": raw["ItemGrade2"],
+                "itemLevelMin": 0,
+                "itemLevelMax": 1800,
+            },
+            {
+                "Sort": "BUY_PRICE",
+                "IsDesc": False
+            },
+            site_options(raw.get("SkillOptions", [])),
+            site_options(raw.get("EtcOptions", [])),
+        ))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"Condition은 변경할 수 없습니다: {key}")
+
+    def __repr__(self):
+        return f"Condition({self.name!r})"
+
+    def site_query(self, item_name, page_no, grade_quality):
+        # 기존 build_item이 아이템마다 만들던 infos와 같은 사이트 검색 폼 (필드 순서도 동일)
+        base, sort_option, skill_options, etc_options = self.site_template
+        infos = dict(base)
+        infos["itemName"] = item_name
+        infos["pageNo"] = page_no
+        infos["sortOption"] = sort_option
+        infos["gradeQuality"] = grade_quality
+        infos["skillOptionList"] = skill_options
+        infos["etcOptionList"] = etc_options
+        return infos
+
+
+def compile_conditions(raw_conditions):
+    return {name: Condition(name, raw) for name, raw in raw_conditions.items()}
@@ -0,0 +1,250 @@
+import asyncio
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from metrics import METRICS
+from pagination import PagePlan
+from probe import UNCHANGED
+
+# KST 시간대 정의
+KST = timezone(timedelta(hours=9))
+
+API_URL = "https://developer-lostark.game.onstove.com/auctions/items"
+
+
+class Crawler:
+    def __init__(self, session, concurrency=4, api_url=API_URL, probe=None):
+        self.session = session
+        self.api_url = api_url
+        self.probe = probe  # probe.ChangeProbe (1페이지가 지난 사이클과 같으면 조건을 건너뜀)
+        self.concurrency = max(1, int(concurrency))
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def timed_post(self, condition, payload):
+        # 세마포어 대기 시간은 빼고 실제 요청(쿼터 대기 포함) 시간만 기록
+        with METRICS.span("api_fetch", condition=condition, page=payload.get("PageNo")):
+            return self.session.post(self.api_url, json=payload)
+
+    async def fetch_page(self, semaphore, condition, payload):
+        # requests 세션은 블로킹이므로 스레드 풀에서 실행하고 세마포어로 동시 요청 수를 제한
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, self.timed_post, condition, payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def crawl_condition(self, semaphore, condition, query, plan):
+        pages = []
+        # 조건의 요청 바디는 공유되므로 수정하지 않고 PageNo만 바꾼 얕은 복사본으로 요청
+        payload = dict(query, PageNo=1)
+        try:
+            r = await self.fetch_page(semaphore, condition, payload)
+        except Exception as e:
+            print(f"[x] 검색 오류 발생 - '{condition}': {e}")
+            print(traceback.format_exc())
+            # 수집 실패는 빈 결과와 구분할 수 있도록 None 반환
+            return None
+
+        if self.probe and self.probe.unchanged(condition, r):
+            print(f"[{datetime.now(KST)}] '{condition}' 1페이지 변화 없음 - 건너뜀")
+            return UNCHANGED
+
+        totalCount = r.get("TotalCount", 0)
+        pageSize = r.get("PageSize", 0)
+        print(f"[{datetime.now(KST)}] '{condition}' 조건에 대한 데이터 수집 시작(0/{totalCount})")
+
+        items_list = r.get("Items", [])
+        if not items_list:
+            print(f"[{condition}] 아이템이 없습니다.")
+            return pages
+        pages.append((1, items_list))
+
+        if plan.mode == 'threshold':
+            # 알림 구간을 벗어날 때까지 한 페이지씩 요청
+            threshold = plan.threshold_price(items_list)
+            page_no = 1
+            while plan.wants_next(page_no, items_list, threshold, totalCount, pageSize):
+                page_no += 1
+                payload = dict(query, PageNo=page_no)
+                try:
+                    result = await self.fetch_page(semaphore, condition, payload)
+                except Exception as e:
+                    print(f"[x] 검색 오류 발생 - '{condition}' {page_no}페이지: {e}")
+                    if self.probe:
+                        self.probe.discard(condition)
+                    break
+                items_list = result.get("Items", [])
+                if not items_list:
+                    break
+                pages.append((page_no, items_list))
+            return pages
+
+        # 나머지 페이지는 병렬로 요청
+        tasks = []
+        page_numbers = plan.remaining_pages(totalCount, pageSize)
+        for page_no in page_numbers:
+            payload = dict(query, PageNo=page_no)
+            tasks.append(self.fetch_page(semaphore, condition, payload))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for page_no, result in zip(page_numbers, results):
+            if isinstance(result, Exception):
+                print(f"[x] 검색 오류 발생 - '{condition}' {page_no}페이지: {result}")
+                # 기존 루프와 마찬가지로 오류가 난 페이지 이후는 버림
+                if self.probe:
+                    self.probe.discard(condition)
+                break
+            items_list = result.get("Items", [])
+            if not items_list:
+                break
+            pages.append((page_no, items_list))
+        return pages
+
+    async def crawl_group(self, semaphore, group, plans, max_pages):
+        # 공통 옵션만으로 검색한 결과를 조건별 필터로 나눠서 각 조건의 페이지 목록을 만듦
+        # 단독 검색 결과를 다 채우지 못한 조건은 None (단독 검색으로 다시 수집)
+        members = {name: [] for name in group.members}
+        page_size = 0
+        exhausted = False
+        page_no = 0
+        while page_no < max_pages:
+            if page_no and all(plans[name].covers(items, page_size) for name, items in members.items()):
+                break
+            page_no += 1
+            payload = dict(group.query, PageNo=page_no)
+            try:
+                r = await self.fetch_page(semaphore, group.name, payload)
+            except Exception as e:
+                print(f"[x] 묶음 검색 오류 발생 - '{group.name}' {page_no}페이지: {e}")
+                # 일시적인 오류는 묶음을 유지한 채 이번 사이클만 단독 검색
+                return {name: None for name in members}, 0
+
+            if page_no == 1:
+                print(f"[{datetime.now(KST)}] '{group.name}' 묶음 검색 데이터 수집 시작(0/{r.get('TotalCount', 0)})")
+            page_size = r.get("PageSize", 0) or page_size
+            if page_size <= 0:
+                # 페이지 크기를 모르면 결과를 단독 검색 페이지로 나눌 수 없으므로 이번 사이클은 단독 검색
+                print(f"[!] 묶음 검색 PageSize 없음 - '{group.name}' 단독 검색으로 수집")
+                return {name: None for name in members}, 0
+            items_list = r.get("Items", [])
+            for item in items_list:
+                for name, condition_filter in group.members.items():
+                    if condition_filter.matches(item):
+                        members[name].append(item)
+            if not items_list or page_size <= 0 or page_no * page_size >= r.get("TotalCount", 0):
+                exhausted = True
+                break
+
+        results = {}
+        for name, items in members.items():
+            if exhausted or plans[name].covers(items, page_size):
+                results[name] = plans[name].split_pages(items, page_size) if items else []
+            else:
+                results[name] = None
+        return results, page_no
+
+    async def crawl_and_emit(self, semaphore, slots, name, query, plan, emit):
+        # slots: 수집했지만 아직 다음 단계로 넘기지 못한 조건 수 제한 (다음 단계가 밀리면 새 조건 수집을 멈춤)
+        async with slots:
+            await emit(name, await self.crawl_condition(semaphore, name, query, plan))
+
+    async def crawl_group_and_emit(self, semaphore, slots, conditions, group, plans, group_max_pages, emit):
+        # 기본 예산은 묶인 조건 수 (각 조건을 단독 검색해도 최소 그만큼은 요청함)
+        async with slots:
+            group_result, fetched = await self.crawl_group(semaphore, group, plans, group_max_pages or len(group.members))
+            # 단독 검색했다면 필요했을 요청 수보다 많이 썼으면 다음 사이클부터 묶지 않음
+            alone = sum(max(1, len(pages)) for pages in group_result.values() if pages is not None)
+            dissolve = fetched > alone
+            if dissolve and alone:
+                print(f"[!] 묶음 검색이 단독 검색보다 요청이 많아 해제 - '{group.name}' ({fetched} > {alone})")
+            fallback = []
+            for name, pages in group_result.items():
+                if pages is None:
+                    if fetched:
+                        # 묶음 검색으로는 부족한 조건이므로 다음 사이클부터는 단독 검색
+                        group.members.pop(name, None)
+                    fallback.append(name)
+                else:
+                    await emit(name, pages)
+            if dissolve:
+                group.members.clear()
+        if fallback:
+            print(f"[!] 묶음 검색으로 다 채우지 못한 조건 단독 검색: {fallback}")
+            await asyncio.gather(*(self.crawl_and_emit(semaphore, slots, name, conditions[name], plans[name], emit) for name in fallback))
+
+    async def crawl(self, conditions, on_result, plans=None, groups=None, group_max_pages=None, max_pending=None):
+        # 모든 조건/페이지 요청을 동시에 진행하고, 조건 수집이 끝나는 대로 on_result(조건 이름, (페이지 번호, 아이템 목록) 리스트)로 넘김
+        # 첫 페이지 요청부터 실패한 조건은 None, probe로 건너뛴 조건은 UNCHANGED
+        semaphore = asyncio.Semaphore(self.concurrency)
+        slots = asyncio.Semaphore(max_pending or len(conditions) or 1)
+        plans = {name: (plans or {}).get(name) or PagePlan() for name in conditions}
+        groups = [group for group in groups or [] if len(group.members) >= 2 and all(name in conditions for name in group.members)]
+        grouped = set(name for group in groups for name in group.members)
+        names = [name for name in conditions if name not in grouped]
+
+        await asyncio.gather(
+            *(self.crawl_and_emit(semaphore, slots, name, conditions[name], plans[name], on_result) for name in names),
+            *(self.crawl_group_and_emit(semaphore, slots, conditions, group, plans, group_max_pages, on_result) for group in groups),
+        )
+
+    def stream(self, conditions, plans=None, groups=None, group_max_pages=None, backlog=2):
+        # 조건별 수집이 끝나는 순서대로 (조건 이름, 페이지 목록)을 내주는 제너레이터
+        # 수집은 별도 스레드의 이벤트 루프에서 진행하고, 소비 쪽이 backlog개 이상 밀리면 새 조건 수집을 멈춤
+        results = queue.Queue(maxsize=max(1, backlog))
+        finished = object()
+        abandoned = threading.Event()
+
+        async def on_result(name, pages):
+            # 큐가 가득 차면 이 조건의 작업만 기다리고 이벤트 루프는 계속 진행
+            while not abandoned.is_set():
+                try:
+                    await asyncio.to_thread(results.put, (name, pages), True, 0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        async def crawl():
+            # 소비 쪽이 멈추면 남은 조건 수집을 취소 (이미 보낸 요청만 끝까지 기다림)
+            task = asyncio.ensure_future(self.crawl(conditions, on_result, plans=plans, groups=groups, group_max_pages=group_max_pages,
+                                                    max_pending=self.concurrency + max(1, backlog)))
+            while not task.done():
+                if abandoned.is_set():
+                    task.cancel()
+                await asyncio.wait({task}, timeout=0.2)
+            if not task.cancelled():
+                task.result()
+
+        def worker():
+            error = None
+            try:
+                asyncio.run(crawl())
+            except BaseException as e:
+                error = e
+            while not abandoned.is_set():
+                try:
+                    results.put((finished, error), timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+        thread = threading.Thread(target=worker, name="crawler-stream", daemon=True)
+        thread.start()
+        try:
+            while True:
+                name, pages = results.get()
+                if name is finished:
+                    if pages is not None:
+                        raise pages
+                    break
+                yield name, pages
+        finally:
+            # 소비 쪽이 중간에 멈춰도 수집 스레드가 큐에서 막히지 않도록 정리
+            abandoned.set()
+            if thread is not threading.current_thread():
+                thread.join()
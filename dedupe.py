@@ -0,0 +1,105 @@
+import time
+
+# 경매 종료 후에도 목록에서 잠깐 보일 수 있으므로 종료 시간보다 조금 더 보관
+EXPIRY_GRACE_MS = 60 * 60 * 1000
+# 만료 시간이 없던 이전 버전의 기록은 이 기간 뒤에 정리
+LEGACY_TTL_MS = 7 * 24 * 60 * 60 * 1000
+SWEEP_INTERVAL = 60.0
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+class NotifiedStore:
+    # 알림 보낸 매물 ID -> 만료 시각(epoch 밀리초)
+    # 조회는 메모리에서만 하고, DB에는 재시작 시 복원용으로 만료 시각과 함께 저장
+    def __init__(self, conn, sweep_interval=SWEEP_INTERVAL):
+        self.conn = conn
+        self.sweep_interval = sweep_interval
+        self.entries = {}
+        self.pending = {}
+        self.last_sweep = 0.0
+        self.checks = 0
+        self.hits = 0
+        self.swept = 0
+
+    def load(self):
+        self.sweep(force=True)
+        cursor = self.conn.execute('SELECT item_id, expires_at FROM notified_items')
+        self.entries = dict(cursor.fetchall())
+        print(f"[+] 알림 기록 {len(self.entries)}건 로드")
+
+    def __contains__(self, item_id):
+        self.checks += 1
+        expires_at = self.entries.get(item_id)
+        if expires_at is None:
+            return False
+        if expires_at <= now_ms():
+            # 만료된 기록은 sweep 전이라도 없는 것으로 취급
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, item_id, end_ms=None):
+        expires_at = (end_ms + EXPIRY_GRACE_MS) if end_ms is not None else now_ms() + LEGACY_TTL_MS
+        self.entries[item_id] = expires_at
+        self.pending[item_id] = expires_at
+
+    def claim(self, item_id, end_ms=None):
+        # 여러 워커 프로세스가 같은 DB를 쓸 때: DB에 기록이 없거나 만료된 경우에만 기록하고 True (먼저 기록한 워커만 알림 전송)
+        if item_id in self:
+            return False
+        expires_at = (end_ms + EXPIRY_GRACE_MS) if end_ms is not None else now_ms() + LEGACY_TTL_MS
+        with self.conn:
+            claimed = self.conn.execute('''
+            INSERT INTO notified_items (item_id, expires_at) VALUES (?, ?)
+            ON CONFLICT(item_id) DO UPDATE SET expires_at = excluded.expires_at WHERE notified_items.expires_at <= ?
+            ''', (item_id, expires_at, now_ms())).rowcount == 1
+        if claimed:
+            self.entries[item_id] = expires_at
+        else:
+            # 다른 워커가 이미 알림을 보낸 매물은 메모리에도 올려서 다음부터 DB 조회 없이 건너뜀
+            row = self.conn.execute('SELECT expires_at FROM notified_items WHERE item_id = ?', (item_id,)).fetchone()
+            if row is not None:
+                self.entries[item_id] = row[0]
+        return claimed
+
+    def release(self, item_id):
+        # 선점한 뒤 알림을 보내지 못했으면 기록을 지워서 다음 사이클에 다시 알림
+        self.entries.pop(item_id, None)
+        self.pending.pop(item_id, None)
+        with self.conn:
+            self.conn.execute('DELETE FROM notified_items WHERE item_id = ?', (item_id,))
+
+    def flush(self):
+        if self.pending:
+            with self.conn:
+                self.conn.executemany('INSERT OR REPLACE INTO notified_items (item_id, expires_at) VALUES (?, ?)',
+                                      list(self.pending.items()))
+            self.pending = {}
+        self.sweep()
+
+    def sweep(self, force=False):
+        # 경매가 끝난 매물의 기록은 메모리와 DB에서 함께 정리
+        if not force and time.monotonic() - self.last_sweep < self.sweep_interval:
+            return 0
+        self.last_sweep = time.monotonic()
+        current = now_ms()
+        expired = [item_id for item_id, expires_at in self.entries.items() if expires_at <= current]
+        for item_id in expired:
+            del self.entries[item_id]
+            self.pending.pop(item_id, None)
+        with self.conn:
+            removed = self.conn.execute('DELETE FROM notified_items WHERE expires_at <= ?', (current,)).rowcount
+        self.swept += removed
+        return removed
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "checks": self.checks,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.checks if self.checks else 0.0,
+            "swept": self.swept,
+        }
@@ -0,0 +1,261 @@
+import argparse
+import os
+import sqlite3
+import sys
+from array import array
+from bisect import bisect_left
+
+from dedupe import now_ms
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 최저가가 그대로여도 이 간격마다 한 번은 기록 (시간축 통계가 끊기지 않도록)
+HEARTBEAT_MS = 10 * 60 * 1000
+# 로버스트 z-score에서 MAD를 표준편차 단위로 바꾸는 상수
+MAD_SCALE = 1.4826
+HOUR_MS = 60 * 60 * 1000
+
+
+def percentile(sorted_values, q):
+    # 선형 보간 백분위 (q: 0~100). sorted_values는 정렬된 시퀀스
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def ewma(values, alpha):
+    result = None
+    for value in values:
+        result = value if result is None else alpha * value + (1 - alpha) * result
+    return result
+
+
+def robust_stats(sorted_values):
+    # (중앙값, MAD)
+    median = percentile(sorted_values, 50)
+    deviations = sorted(abs(value - median) for value in sorted_values)
+    return median, percentile(deviations, 50)
+
+
+def robust_z(value, median, mad):
+    if not mad:
+        return 0.0
+    return (value - median) / (MAD_SCALE * mad)
+
+
+class PriceHistory:
+    # 조건별 최저가 시계열. DB에는 (조건, 시각, 최저가, 매물 수)만 추가하고, 메모리에는 array로 보관
+    def __init__(self, conn, heartbeat_ms=HEARTBEAT_MS, retention_ms=None):
+        self.conn = conn
+        self.heartbeat_ms = heartbeat_ms
+        self.retention_ms = retention_ms  # 메모리에 남길 기간 (None이면 전체, DB에는 모두 남김)
+        self.series = {}  # condition -> (array('q') 시각, array('d') 최저가)
+        self.pending = []
+
+    def init_schema(self):
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS price_history (
+            condition_name TEXT,
+            ts INTEGER,
+            lowest_price REAL,
+            listings INTEGER,
+            PRIMARY KEY (condition_name, ts)
+        ) WITHOUT ROWID
+        ''')
+        self.conn.commit()
+
+    def load(self, condition):
+        if condition not in self.series:
+            timestamps = array('q')
+            prices = array('d')
+            since_ms = now_ms() - self.retention_ms if self.retention_ms else 0
+            cursor = self.conn.execute('SELECT ts, lowest_price FROM price_history WHERE condition_name = ? AND ts >= ? ORDER BY ts',
+                                       (condition, since_ms))
+            for ts, price in cursor:
+                timestamps.append(ts)
+                prices.append(price)
+            self.series[condition] = (timestamps, prices)
+        return self.series[condition]
+
+    def forget(self, condition):
+        # 다른 워커가 이어서 기록했을 수 있으므로 다음 조회 때 DB에서 다시 읽음
+        self.series.pop(condition, None)
+
+    def record(self, condition, lowest_price, listings, ts=None):
+        # 최저가가 바뀌었거나 heartbeat 간격이 지났을 때만 기록
+        ts = ts or now_ms()
+        timestamps, prices = self.load(condition)
+        if timestamps and prices[-1] == lowest_price and ts - timestamps[-1] < self.heartbeat_ms:
+            return False
+        if timestamps and ts <= timestamps[-1]:
+            return False
+        timestamps.append(ts)
+        prices.append(lowest_price)
+        self.pending.append((condition, ts, lowest_price, listings))
+        if self.retention_ms:
+            stale = bisect_left(timestamps, ts - self.retention_ms)
+            if stale > 64:
+                del timestamps[:stale]
+                del prices[:stale]
+        return True
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO price_history (condition_name, ts, lowest_price, listings) VALUES (?, ?, ?, ?)',
+                                  self.pending)
+        self.pending = []
+
+    def window(self, condition, start_ms, end_ms=None):
+        # [start_ms, end_ms) 구간의 최저가 (시각이 정렬돼 있으므로 이분 탐색으로 잘라냄)
+        timestamps, prices = self.load(condition)
+        start = bisect_left(timestamps, start_ms)
+        end = len(timestamps) if end_ms is None else bisect_left(timestamps, end_ms)
+        return prices[start:end]
+
+    def conditions(self):
+        return [row[0] for row in self.conn.execute('SELECT DISTINCT condition_name FROM price_history')]
+
+
+# config "price_model" 섹션에 쓸 수 있는 키 (PriceModel 인자)
+MODEL_SETTINGS = ('mode', 'band', 'percentile', 'z', 'ewma_alpha', 'ewma_discount', 'window_hours', 'min_samples', 'max_band')
+
+
+class PriceModel:
+    # 알림 구간 결정. band: 기존처럼 최저가 * alert_band
+    # stats: 최근 window 동안의 최저가 분포에서 하위 percentile 이하이거나 로버스트 z-score가 -z 이하이거나
+    #        EWMA 대비 ewma_discount 이상 싼 가격까지를 알림 구간으로 사용 (이력이 부족하면 band)
+    def __init__(self, history=None, mode='band', band=1.15, percentile=20.0, z=1.5, ewma_alpha=0.1, ewma_discount=None,
+                 window_hours=168, min_samples=30, max_band=1.3):
+        if mode not in ('band', 'stats'):
+            raise ValueError(f"알 수 없는 가격 모델: {mode}")
+        self.history = history
+        self.mode = mode
+        self.band = band
+        self.percentile = percentile
+        self.z = z
+        self.ewma_alpha = ewma_alpha
+        self.ewma_discount = ewma_discount
+        self.window_ms = int(window_hours * HOUR_MS)
+        self.min_samples = min_samples
+        self.max_band = max_band
+
+    @classmethod
+    def from_config(cls, history, config, band):
+        # config "price_model" 섹션. band는 섹션에 있으면 그 값을, 없으면 전역 alert_band를 사용
+        settings = dict(config or {})
+        unknown = sorted(set(settings) - set(MODEL_SETTINGS))
+        if unknown:
+            raise ValueError(f"알 수 없는 price_model 설정: {', '.join(unknown)}")
+        settings.setdefault("band", band)
+        return cls(history, **settings)
+
+    @property
+    def page_band(self):
+        # threshold 페이지 모드에서 구간을 벗어났다고 판단할 기준 (stats 모드는 최대 구간까지 가져와야 함)
+        return max(self.band, self.max_band) if self.mode == 'stats' else self.band
+
+    def stats_threshold(self, window):
+        if len(window) < self.min_samples:
+            return None
+        ordered = sorted(window)
+        candidates = [percentile(ordered, self.percentile)]
+        median, mad = robust_stats(ordered)
+        if mad:
+            candidates.append(median - self.z * MAD_SCALE * mad)
+        if self.ewma_discount is not None:
+            candidates.append(ewma(window, self.ewma_alpha) * (1 - self.ewma_discount))
+        return max(candidates)
+
+    def threshold(self, condition, current_lowest_price, now=None):
+        if self.mode == 'band' or self.history is None:
+            return current_lowest_price * self.band
+        end = now or now_ms()
+        stats_price = self.stats_threshold(self.history.window(condition, end - self.window_ms, end))
+        if stats_price is None:
+            return current_lowest_price * self.band
+        # 최저가 아이템은 항상 포함하고, 구간은 max_band를 넘지 않도록 제한
+        return min(max(current_lowest_price, stats_price), current_lowest_price * self.max_band)
+
+
+def backtest_condition(history, model, condition):
+    # 기록된 시점마다 그 이전 window만으로 구간을 계산해서, 그 시점의 최저가가 알림 대상이었을지 확인
+    timestamps, prices = history.load(condition)
+    if not timestamps:
+        return None
+    deals = 0
+    drops = 0
+    evaluated = 0
+    for index in range(1, len(timestamps)):
+        ts = timestamps[index]
+        price = prices[index]
+        # 기존 규칙: 직전 최저가보다 낮아지면 최저가 갱신 알림
+        if price < prices[index - 1]:
+            drops += 1
+        stats_price = model.stats_threshold(history.window(condition, ts - model.window_ms, ts))
+        if stats_price is None:
+            continue
+        evaluated += 1
+        if price <= stats_price:
+            deals += 1
+    days = max((timestamps[-1] - timestamps[0]) / (24 * HOUR_MS), 1 / 24)
+    return {
+        "samples": len(timestamps),
+        "evaluated": evaluated,
+        "deals": deals,
+        "deals_per_day": deals / days,
+        "drops_per_day": drops / days,
+        "days": days,
+    }
+
+
+def backtest(args):
+    conn = sqlite3.connect(args.db)
+    history = PriceHistory(conn)
+    conditions = [args.condition] if args.condition else history.conditions()
+    if not conditions:
+        print("[x] 기록된 가격 이력이 없습니다.")
+        return
+
+    grid = [(p, z) for p in args.percentile for z in args.z]
+    print(f"[+] 조건 {len(conditions)}개, 설정 {len(grid)}개 (window {args.window_hours}시간, 최소 표본 {args.min_samples})")
+    for condition in conditions:
+        print(f"\n[{condition}]")
+        for p, z in grid:
+            model = PriceModel(history, mode='stats', percentile=p, z=z, window_hours=args.window_hours,
+                               min_samples=args.min_samples, ewma_alpha=args.ewma_alpha, ewma_discount=args.ewma_discount)
+            result = backtest_condition(history, model, condition)
+            if result is None:
+                print("    이력 없음")
+                break
+            print(f"    percentile {p:>5.1f}, z {z:>4.1f}: 표본 {result['samples']}, 평가 {result['evaluated']}, "
+                  f"알림 {result['deals']}건 ({result['deals_per_day']:.1f}/일), 기존 최저가 갱신 {result['drops_per_day']:.1f}/일")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="조건별 최저가 이력으로 알림 구간 설정 백테스트")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_backtest = sub.add_parser("backtest", help="기록된 최저가 이력에 가격 모델을 적용해 알림 빈도 확인")
+    p_backtest.add_argument("--db", default=os.path.join(current_dir, "items.db"))
+    p_backtest.add_argument("--condition")
+    p_backtest.add_argument("--percentile", type=float, nargs="+", default=[10.0, 20.0, 30.0])
+    p_backtest.add_argument("--z", type=float, nargs="+", default=[1.0, 1.5, 2.0])
+    p_backtest.add_argument("--window-hours", type=float, default=168)
+    p_backtest.add_argument("--min-samples", type=int, default=30)
+    p_backtest.add_argument("--ewma-alpha", type=float, default=0.1)
+    p_backtest.add_argument("--ewma-discount", type=float)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"[x] DB 파일이 없습니다: {args.db}")
+        sys.exit(1)
+    backtest(args)
+
+
+if __name__ == '__main__':
+    main()
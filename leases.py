@@ -0,0 +1,139 @@
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# 워커가 이 시간(초) 동안 갱신하지 않으면 죽은 것으로 보고 다른 워커가 조건을 가져감
+DEFAULT_LEASE_TTL = 30.0
+
+
+class LeaseStore:
+    # 조건별 담당 워커를 SQLite 파일에 기록하는 공유 저장소
+    # (같은 호스트의 여러 프로세스용. 네트워크 파일시스템에서는 SQLite 잠금이 보장되지 않으므로 여러 호스트는 같은 인터페이스의 공유 저장소로 교체)
+    # 각 워커는 주기적으로 자기 lease를 갱신하고, 살아있는 워커 수 기준 자기 몫보다 많으면 내놓고 적으면 만료된 조건을 가져감
+    def __init__(self, path, ttl=DEFAULT_LEASE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+
+    def init_schema(self, conditions):
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS workers (
+            worker_id TEXT PRIMARY KEY,
+            host TEXT,
+            pid INTEGER,
+            heartbeat_at REAL
+        )
+        ''')
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS leases (
+            condition_name TEXT PRIMARY KEY,
+            worker_id TEXT,
+            expires_at REAL
+        )
+        ''')
+        self.conn.executemany('INSERT OR IGNORE INTO leases (condition_name, worker_id, expires_at) VALUES (?, NULL, 0)',
+                              [(name,) for name in conditions])
+
+    def close(self):
+        self.conn.close()
+
+    def balance(self, worker_id, conditions, now=None):
+        # 하트비트 + lease 갱신 + 재분배를 한 트랜잭션으로 처리하고 이 워커가 담당할 조건 집합을 반환
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('INSERT OR REPLACE INTO workers (worker_id, host, pid, heartbeat_at) VALUES (?, ?, ?, ?)',
+                         (worker_id, socket.gethostname(), os.getpid(), now))
+            conn.execute('DELETE FROM workers WHERE heartbeat_at < ?', (now - self.ttl,))
+            live = conn.execute('SELECT COUNT(*) FROM workers').fetchone()[0]
+            target = math.ceil(len(conditions) / max(1, live))
+
+            conn.execute('UPDATE leases SET expires_at = ? WHERE worker_id = ?', (expires_at, worker_id))
+            owned = sorted(name for (name,) in conn.execute('SELECT condition_name FROM leases WHERE worker_id = ?', (worker_id,))
+                           if name in conditions)
+            if len(owned) > target:
+                # 새 워커가 들어왔으면 몫을 넘는 조건을 내놓음
+                released = owned[target:]
+                conn.executemany('UPDATE leases SET worker_id = NULL, expires_at = 0 WHERE condition_name = ? AND worker_id = ?',
+                                 [(name, worker_id) for name in released])
+                owned = owned[:target]
+            elif len(owned) < target:
+                # 주인이 없거나 lease가 만료된 조건(죽은 워커의 조건 포함)을 몫만큼 가져감
+                free = [name for (name,) in conn.execute('SELECT condition_name FROM leases WHERE worker_id IS NULL OR expires_at < ? ORDER BY condition_name', (now,))
+                        if name in conditions]
+                taken = free[:target - len(owned)]
+                conn.executemany('UPDATE leases SET worker_id = ?, expires_at = ? WHERE condition_name = ?',
+                                 [(worker_id, expires_at, name) for name in taken])
+                owned += taken
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return set(owned), live
+
+    def release(self, worker_id):
+        # 정상 종료 시 담당 조건을 바로 내놓아서 다른 워커가 lease 만료를 기다리지 않게 함
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute('UPDATE leases SET worker_id = NULL, expires_at = 0 WHERE worker_id = ?', (worker_id,))
+        self.conn.execute('DELETE FROM workers WHERE worker_id = ?', (worker_id,))
+        self.conn.execute("COMMIT")
+
+
+class LeaseKeeper:
+    # 백그라운드 스레드에서 ttl/3 간격으로 lease를 갱신하고, 담당 조건 집합을 메인 스레드에 알려줌
+    def __init__(self, store, conditions):
+        self.store = store
+        self.conditions = set(conditions)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.owned = set()
+        self.acquired = set()  # 아직 메인 스레드가 확인하지 않은 새로 맡은 조건
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self):
+        owned, live = self.store.balance(self.worker_id, self.conditions)
+        with self.lock:
+            added = owned - self.owned
+            removed = self.owned - owned
+            self.acquired |= added
+            self.acquired -= removed
+            self.owned = owned
+        if added or removed:
+            print(f"[+] 담당 조건 변경 ({self.worker_id}, 워커 {live}개) - 담당 {len(owned)}개, 추가 {sorted(added)}, 해제 {sorted(removed)}")
+
+    def loop(self):
+        while not self.stopped.wait(self.store.ttl / 3):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[x] lease 갱신 실패: {e}")
+
+    def start(self):
+        self.refresh()
+        self.thread = threading.Thread(target=self.loop, name="lease-keeper", daemon=True)
+        self.thread.start()
+
+    def take(self):
+        # (현재 담당 조건, 지난 확인 이후 새로 맡은 조건)
+        with self.lock:
+            acquired = self.acquired
+            self.acquired = set()
+            return set(self.owned), acquired
+
+    def close(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        try:
+            self.store.release(self.worker_id)
+        finally:
+            self.store.close()
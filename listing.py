@@ -0,0 +1,185 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+from matching import fingerprint, option_key
+
+# KST 시간대 정의 (API의 EndDate는 시간대 없는 KST 문자열)
+KST = timezone(timedelta(hours=9))
+
+
+class OptionTable:
+    # "추가 피해 - 2.6%" 같은 옵션 문자열을 정수 id로 인턴. 같은 옵션은 모든 매물이 같은 id를 공유
+    def __init__(self):
+        self.ids = {}
+        self.texts = []
+        self.keys = []
+        self.lock = threading.Lock()
+
+    def intern(self, text, key):
+        option_id = self.ids.get(text)
+        if option_id is None:
+            with self.lock:
+                option_id = self.ids.get(text)
+                if option_id is None:
+                    option_id = len(self.texts)
+                    self.texts.append(text)
+                    self.keys.append(key)
+                    self.ids[text] = option_id
+        return option_id
+
+    def intern_option(self, name, value, is_percentage):
+        # API/사이트 옵션 dict 기준. 문자열 형식은 기존 optionInfo와 동일
+        text = f"{name} - {value}%" if is_percentage else f"{name} - {value}"
+        option_id = self.ids.get(text)
+        if option_id is not None:
+            return option_id
+        return self.intern(text, option_key(name, value))
+
+    def intern_text(self, text):
+        # DB의 optionInfo 한 줄 기준
+        option_id = self.ids.get(text)
+        if option_id is not None:
+            return option_id
+        name, _, value = text.rpartition(' - ')
+        return self.intern(text, option_key(name, value.replace('%', '')))
+
+
+OPTIONS = OptionTable()
+
+
+def parse_end_ms(text, tz=KST):
+    # ISO 문자열 -> epoch 밀리초. tz가 None이면 시간대 없는 값을 로컬 시간으로 취급 (사이트 파서 결과)
+    try:
+        dt = datetime.fromisoformat(text)
+    except TypeError:
+        return None
+    except ValueError:
+        # Python 3.10 이하의 fromisoformat은 소수점 아래 3/6자리만 받으므로 ("...16.85") 기존 strptime 형식으로 다시 시도
+        dt = None
+        for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S'):
+            try:
+                dt = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        if dt is None:
+            return None
+    if dt.tzinfo is None and tz is not None:
+        dt = dt.replace(tzinfo=tz)
+    return round(dt.timestamp() * 1000)
+
+
+def format_end(end_ms):
+    # epoch 밀리초 -> API와 같은 형식의 KST 문자열 ("2024-10-10T21:17:16.853", 끝자리 0은 생략)
+    seconds, millis = divmod(end_ms, 1000)
+    text = datetime.fromtimestamp(seconds, KST).strftime('%Y-%m-%dT%H:%M:%S')
+    if millis:
+        text += '.' + f"{millis:03d}".rstrip('0')
+    return text
+
+
+def make_listing_key(name, quality, trade_count, option_info, end_text):
+    # 매물 식별자: 이름, 품질, 거래 가능 횟수, 옵션, 종료 시간은 매물이 내려가기 전까지 변하지 않음
+    unique_string = f"{name}_{quality}_{trade_count}_{option_info}_{end_text}"
+    return hashlib.md5(unique_string.encode('utf-8')).hexdigest()
+
+
+def make_alert_id(name, option_info, price, end_text):
+    # 알림 중복 확인용 ID (기존 generate_item_id와 동일한 값)
+    # 기존에는 items.price(REAL) 컬럼에서 다시 읽은 가격으로 계산했으므로 API의 정수 가격도 float로 맞춰야 50000.0 형태가 됨
+    unique_string = f"{name}_{option_info}_{float(price) if price is not None else price}_{end_text}"
+    return hashlib.md5(unique_string.encode('utf-8')).hexdigest()
+
+
+class Listing:
+    __slots__ = ('name', 'grade_quality', 'trade_count', 'options', 'end_ms', 'price', 'start_price', 'bid_price',
+                 'icon', 'page_no', 'key', 'product_id', '_alert_id', '_fingerprint')
+
+    def __init__(self, name, grade_quality, trade_count, options, end_ms, price, start_price=None, bid_price=None,
+                 icon=None, page_no=None, key=None, product_id=None, alert_id=None, fingerprint=None):
+        self.name = name
+        self.grade_quality = grade_quality
+        self.trade_count = trade_count
+        self.options = options  # OPTIONS id 튜플
+        self.end_ms = end_ms
+        self.price = price  # 즉시 구매가
+        self.start_price = start_price
+        self.bid_price = bid_price
+        self.icon = icon
+        self.page_no = page_no
+        self.key = key
+        self.product_id = product_id
+        self._alert_id = alert_id
+        self._fingerprint = fingerprint
+
+    def __repr__(self):
+        return f"Listing({self.name!r}, {self.price}, {self.end_text})"
+
+    @property
+    def option_info(self):
+        return '\n'.join(OPTIONS.texts[option_id] for option_id in self.options)
+
+    @property
+    def option_keys(self):
+        return [OPTIONS.keys[option_id] for option_id in self.options]
+
+    @property
+    def end_text(self):
+        return format_end(self.end_ms) if self.end_ms is not None else None
+
+    @property
+    def end_time(self):
+        return datetime.fromtimestamp(self.end_ms / 1000, KST) if self.end_ms is not None else None
+
+    @property
+    def alert_id(self):
+        if self._alert_id is None:
+            self._alert_id = make_alert_id(self.name, self.option_info, self.price, self.end_text)
+        return self._alert_id
+
+    @property
+    def fingerprint(self):
+        # 사이트 검색 결과와 매칭할 때 쓰는 키는 처음 필요할 때 한 번만 계산
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(self.name, self.grade_quality, self.price, self.start_price, self.bid_price,
+                                            self.trade_count, self.option_keys)
+        return self._fingerprint
+
+    def prices(self):
+        # 경매 진행 중에 바뀔 수 있는 값. 이 값만 달라지면 같은 매물의 가격 변동으로 취급
+        return (self.price, self.start_price, self.bid_price)
+
+
+def from_api(item, page_no):
+    # API 응답 아이템 -> Listing (가격이나 종료 시간이 없으면 None)
+    auction_info = item.get("AuctionInfo", {})
+    price = auction_info.get("BuyPrice")
+    end_text = auction_info.get("EndDate")
+    if price is None or end_text is None:
+        return None
+
+    options = tuple(OPTIONS.intern_option(option.get("OptionName", "Unknown Option").strip(), option.get("Value", 0),
+                                          option.get("IsValuePercentage", False))
+                    for option in item.get("Options", []))
+    name = item.get("Name")
+    quality = item.get("GradeQuality")
+    trade_count = auction_info.get("TradeAllowCount")
+    option_info = '\n'.join(OPTIONS.texts[option_id] for option_id in options)
+    # 식별자는 API가 준 종료 시간 문자열 그대로 계산해서 기존 DB/알림 기록과 같은 값을 유지
+    return Listing(name, quality, trade_count, options, parse_end_ms(end_text), price,
+                   start_price=auction_info.get("StartPrice"), bid_price=auction_info.get("BidPrice"),
+                   icon=item.get("Icon"), page_no=page_no,
+                   key=make_listing_key(name, quality, trade_count, option_info, end_text),
+                   alert_id=make_alert_id(name, option_info, price, end_text))
+
+
+def from_auction(result):
+    # 사이트 검색 결과(parse_auction_items) -> Listing
+    auction_info = result['AuctionInfo']
+    options = tuple(OPTIONS.intern_option(option['OptionName'], option['Value'], option.get('IsValuePercentage', False))
+                    for option in result['Options'])
+    return Listing(result['Name'], result.get('GradeQuality'), auction_info.get('TradeAllowCount'), options,
+                   parse_end_ms(auction_info.get('EndDate'), tz=None), auction_info.get('BuyPrice'),
+                   start_price=auction_info.get('StartPrice'), bid_price=auction_info.get('BidPrice'),
+                   icon=result.get('Icon'), product_id=result.get('ProductId'), fingerprint=result.get('Fingerprint'))
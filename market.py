@@ -0,0 +1,84 @@
+from priceindex import PriceIndex
+
+
+class MarketDelta:
+    def __init__(self, added, removed, changed):
+        self.added = added      # 새로 등록된 매물 (key -> item)
+        self.removed = removed  # 판매/만료 등으로 사라진 매물 (key -> item)
+        self.changed = changed  # 가격이 바뀐 매물 (key -> item, 새 값)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def alert_candidates(self):
+        # 알림 대상은 새로 등록됐거나 가격이 바뀐 매물뿐
+        candidates = dict(self.added)
+        candidates.update(self.changed)
+        return candidates
+
+
+def diff_snapshot(previous, current):
+    added = {}
+    changed = {}
+    for key, item in current.items():
+        old = previous.get(key)
+        if old is None:
+            added[key] = item
+        elif old.prices() != item.prices():
+            # 이름/옵션/종료 시간이 같은 매물의 가격만 바뀐 경우
+            changed[key] = item
+    removed = {key: item for key, item in previous.items() if key not in current}
+    return MarketDelta(added, removed, changed)
+
+
+class MarketState:
+    def __init__(self):
+        # condition_name -> {listing_key: Listing} (DB items 테이블과 같은 내용)
+        self.listings = {}
+        # condition_name -> PriceIndex (종료되지 않은 매물의 가격 색인, 알림 판단용)
+        self.indexes = {}
+        # condition_name -> 알림을 보내지 못해서 다음 사이클에 다시 알림 후보로 넘길 listing_key
+        self.retries = {}
+
+    def loaded(self, condition):
+        return condition in self.listings
+
+    def load(self, condition, items):
+        self.listings[condition] = {item.key: item for item in items}
+        self.indexes[condition] = PriceIndex(items)
+
+    def forget(self, condition):
+        # 다른 워커가 담당하던 조건을 넘겨받으면 다음 사이클에 DB에서 다시 읽음
+        self.listings.pop(condition, None)
+        self.indexes.pop(condition, None)
+
+    def retry(self, condition, key):
+        # 알림 전송에 실패한 매물은 DB에는 이미 반영됐으므로 다음 apply에서 가격이 바뀐 것처럼 다시 후보로 넘김
+        self.retries.setdefault(condition, set()).add(key)
+
+    def apply(self, condition, items):
+        # 이번 사이클 스냅샷과 이전 상태를 비교해 변경분만 돌려주고 상태를 갱신
+        current = {item.key: item for item in items}
+        delta = diff_snapshot(self.listings.get(condition, {}), current)
+        for key in self.retries.pop(condition, ()):
+            if key in current and key not in delta.added:
+                delta.changed[key] = current[key]
+        self.listings[condition] = current
+        # 가격 색인은 다시 만들지 않고 변경분만 반영
+        index = self.indexes.get(condition)
+        if index is None:
+            self.indexes[condition] = PriceIndex(items)
+        else:
+            for key in delta.removed:
+                index.discard(key)
+            # 가격이 바뀐 매물만 다시 정렬하고, 나머지는 이번 스냅샷의 Listing으로 참조만 교체
+            for item in items:
+                index.update(item)
+            index.compact()
+        return delta
+
+    def index(self, condition):
+        index = self.indexes.get(condition)
+        if index is None:
+            index = self.indexes[condition] = PriceIndex()
+        return index
@@ -0,0 +1,116 @@
+from collections import Counter
+from datetime import timedelta
+
+# True면 매칭 실패 시 기존 items_match의 상세 비교 결과를 출력 (config "debug_matching")
+DEBUG = False
+
+TIME_TOLERANCE = timedelta(minutes=3)
+
+
+def option_key(name, value):
+    # "추가 피해 - 2.6%" / {'OptionName': '추가 피해', 'Value': 2.6} 를 같은 키로 정규화
+    return (name.strip(), round(float(value), 4))
+
+
+def to_int(value):
+    return None if value is None else int(value)
+
+
+def fingerprint(name, quality, buy_price, start_price, bid_price, trade_count, options):
+    # 매물 비교에 쓰는 정규화된 키 (종료 시간은 사이트가 분 단위로만 보여주므로 제외)
+    return (name, to_int(quality), to_int(buy_price), to_int(start_price), to_int(bid_price), to_int(trade_count), tuple(sorted(options)))
+
+
+def auction_fingerprint(result):
+    # parse_auction_items 결과(사이트 HTML 경로)용
+    auction_info = result['AuctionInfo']
+    return fingerprint(result['Name'], result.get('GradeQuality'), auction_info.get('BuyPrice'), auction_info.get('StartPrice'),
+                       auction_info.get('BidPrice'), auction_info.get('TradeAllowCount'),
+                       [option_key(option['OptionName'], option['Value']) for option in result['Options']])
+
+
+def items_match(item1, item2, time_tolerance=TIME_TOLERANCE):
+    # 매칭 실패 원인 확인용 상세 비교 (DEBUG일 때만 호출됨). item1은 API 매물, item2는 사이트 검색 결과 (둘 다 Listing)
+    if item1.name != item2.name:
+        print(f"Item name mismatch: {item1.name} != {item2.name}")
+        return False
+    if item1.grade_quality != item2.grade_quality:
+        print(f"Grade quality mismatch: {item1.grade_quality} != {item2.grade_quality}")
+        return False
+    if item1.price != item2.price:
+        print(f"Buy price mismatch: {item1.price} != {item2.price}")
+        return False
+    if item1.trade_count != item2.trade_count:
+        print(f"Trade allow count mismatch: {item1.trade_count} != {item2.trade_count}")
+        return False
+
+    # Compare auction prices
+    if item1.start_price != item2.start_price:
+        print(f"Start price mismatch: {item1.start_price} != {item2.start_price}")
+        return False
+    if item1.bid_price != item2.bid_price:
+        print(f"Bid price mismatch: {item1.bid_price} != {item2.bid_price}")
+        return False
+
+    # Compare end dates with tolerance
+    if item1.end_ms is not None and item2.end_ms is not None:
+        if abs(item1.end_ms - item2.end_ms) > time_tolerance.total_seconds() * 1000:
+            print(f"End date mismatch beyond tolerance: {item1.end_time} != {item2.end_time}")
+            return False
+    else:
+        print("Cannot compare items without valid end dates")
+        return False
+
+    # Compare options
+    options1 = Counter(item1.option_keys)
+    options2 = Counter(item2.option_keys)
+    if options1 != options2:
+        print("Options mismatch:")
+        print("Item1 options:", dict(options1))
+        print("Item2 options:", dict(options2))
+
+        # 세부적인 차이점 출력
+        diff1 = options1 - options2
+        diff2 = options2 - options1
+        if diff1:
+            print("Options in Item1 but not in Item2:", dict(diff1))
+        if diff2:
+            print("Options in Item2 but not in Item1:", dict(diff2))
+        return False
+
+    return True
+
+
+class MatchIndex:
+    def __init__(self, result_items, time_tolerance=TIME_TOLERANCE):
+        # 검색 결과 한 페이지(Listing 목록)를 fingerprint 기준으로 색인
+        self.result_items = result_items
+        self.tolerance_ms = time_tolerance.total_seconds() * 1000
+        self.time_tolerance = time_tolerance
+        self.index = {}
+        for result in result_items:
+            self.index.setdefault(result.fingerprint, []).append(result)
+
+    def __len__(self):
+        return len(self.result_items)
+
+    def find(self, item):
+        candidates = self.index.get(item.fingerprint, [])
+        if len(candidates) == 1:
+            return candidates[0]
+        if candidates:
+            # 같은 fingerprint가 여러 개일 때만 종료 시간이 가장 가까운 매물을 선택
+            best = None
+            best_diff = None
+            for candidate in candidates:
+                if item.end_ms is None or candidate.end_ms is None:
+                    continue
+                diff = abs(item.end_ms - candidate.end_ms)
+                if diff <= self.tolerance_ms and (best_diff is None or diff < best_diff):
+                    best, best_diff = candidate, diff
+            return best
+
+        if DEBUG:
+            for result in self.result_items:
+                items_match(item, result, self.time_tolerance)
+        return None
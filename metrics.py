@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "lostark_noti"
+
+# 단계별 소요 시간 히스토그램 구간(초). API/사이트 요청은 수백 ms, 파싱/매칭은 ms 단위
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CYCLE_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels, extra=None):
+    pairs = list(labels)
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+        yield float('inf'), self.count
+
+
+class Metrics:
+    # 카운터/히스토그램 모음. 여러 스레드(크롤러 스레드 풀, 디스코드 전송 스레드)에서 함께 기록
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}    # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: Histogram}
+        self.buckets = {"stage_seconds": STAGE_BUCKETS, "cycle_seconds": CYCLE_BUCKETS, "condition_ready_seconds": CYCLE_BUCKETS}
+        self.help = {}
+        self.log_file = None
+        self.server = None
+        self.tracer = None  # 프로파일링 모드의 메모리 추적 (profiling.AllocationTracer)
+
+    def configure(self, log_path=None):
+        # 단계별 소요 시간/이벤트를 JSON lines로 남길 파일 (없으면 로그 파일 없이 메모리에만 집계)
+        if log_path:
+            self.log_file = open(log_path, "a", encoding="utf-8", buffering=1)
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server = None
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = label_key(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets.get(name, STAGE_BUCKETS))
+            histogram.observe(value)
+
+    def event(self, kind, **fields):
+        if self.log_file is None:
+            return
+        line = json.dumps(dict(ts=round(time.time(), 3), type=kind, **fields), ensure_ascii=False, default=str)
+        with self.lock:
+            if self.log_file is not None:
+                self.log_file.write(line + "\n")
+
+    @contextmanager
+    def span(self, stage, **fields):
+        # with METRICS.span("api_fetch", condition=name): ... -> stage_seconds{stage="api_fetch"} 히스토그램과 JSON 로그
+        # fields는 JSON 로그에만 남기고 라벨에는 넣지 않음 (조건 이름마다 시계열이 생기지 않도록)
+        tracer = self.tracer
+        with tracer.trace(stage) if tracer else nullcontext():
+            started = time.perf_counter()
+            error = None
+            try:
+                yield
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.observe("stage_seconds", elapsed, stage=stage)
+                if error:
+                    self.inc("stage_errors_total", stage=stage)
+                self.event("span", stage=stage, duration_ms=round(elapsed * 1000, 3), error=error, **fields)
+
+    def snapshot(self):
+        with self.lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {name: {key: (list(h.cumulative()), h.sum, h.count) for key, h in series.items()}
+                          for name, series in self.histograms.items()}
+        return counters, histograms
+
+    def render(self):
+        # Prometheus text exposition format (0.0.4)
+        counters, histograms = self.snapshot()
+        lines = []
+        for name in sorted(counters):
+            full = f"{PREFIX}_{name}"
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} counter")
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{full}{format_labels(key)} {format_value(value)}")
+        for name in sorted(histograms):
+            full = f"{PREFIX}_{name}"
+            if name in self.help:
+                lines.append(f"# HELP {full} {self.help[name]}")
+            lines.append(f"# TYPE {full} histogram")
+            for key, (buckets, total, count) in sorted(histograms[name].items()):
+                for bound, cumulative in buckets:
+                    lines.append(f"{full}_bucket{format_labels(key, ('le', format_value(bound)))} {cumulative}")
+                lines.append(f"{full}_sum{format_labels(key)} {total!r}")
+                lines.append(f"{full}_count{format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, name="stage_seconds"):
+        # 로그 출력용: 라벨별 (횟수, 합계 초)
+        _, histograms = self.snapshot()
+        return {dict(key).get("stage", ""): (count, total) for key, (_, total, count) in histograms.get(name, {}).items()}
+
+    def serve(self, port, host="127.0.0.1"):
+        # /metrics 에서 Prometheus 텍스트를 돌려주는 백그라운드 HTTP 서버
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"[+] 메트릭 엔드포인트: http://{host}:{self.server.server_address[1]}/metrics")
+
+
+METRICS = Metrics()
+METRICS.describe("stage_seconds", "단계별 소요 시간(초)")
+METRICS.describe("cycle_seconds", "수집/알림 사이클 전체 소요 시간(초)")
+METRICS.describe("condition_ready_seconds", "사이클 시작부터 조건의 수집이 끝나 비교/알림을 시작하기까지 걸린 시간(초)")
+METRICS.describe("stage_errors_total", "예외로 끝난 단계 수")
+METRICS.describe("requests_total", "외부 요청 수 (target: api/site/webhook)")
+METRICS.describe("retries_total", "재시도 수 (reason: quota/rate_limit/server_error/network)")
+METRICS.describe("items_total", "API에서 수집한 매물 수")
+METRICS.describe("alerts_total", "큐에 넣은 디스코드 알림 수 (kind: lowest/normal)")
+METRICS.describe("alerts_sent_total", "전송 성공한 디스코드 알림 수")
+METRICS.describe("alerts_failed_total", "전송 실패한 디스코드 알림 수")
+METRICS.describe("probe_total", "1페이지 변경 확인 결과 (result: skip/changed/forced)")
+METRICS.describe("probe_saved_requests_total", "변경 확인으로 건너뛴 API 페이지 요청 수 (직전 전체 수집 기준 추정)")
+METRICS.describe("cycles_total", "실행한 사이클 수")
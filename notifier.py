@@ -0,0 +1,155 @@
+import itertools
+import json
+import queue
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from metrics import METRICS
+
+# KST 시간대 정의
+KST = timezone(timedelta(hours=9))
+
+# 디스코드 웹훅 제한: 메시지당 임베드 10개, 임베드 글자 수 합계 6000자
+MAX_EMBEDS = 10
+MAX_EMBED_CHARS = 6000
+
+PRIORITY_LOWEST = 0   # 최저가 알림 (webhook_url2)
+PRIORITY_NORMAL = 1   # 일반 알림 (webhook_url)
+
+
+def embed_size(embed):
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    for field in embed.get("fields", []):
+        size += len(field.get("name", "")) + len(field.get("value", ""))
+    return size
+
+
+class Notifier:
+    def __init__(self, max_retries=5, backoff=1.0):
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.session()
+        self.session.verify = False
+        self.session.headers = {
+            "Content-Type": "application/json"
+        }
+        self.thread = None
+        self.sent = 0
+        self.failed = 0
+        # 재시도 끝에 보내지 못한 알림의 claim (메인 스레드가 take_undelivered로 가져가서 알림 기록을 되돌림)
+        self.undelivered = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.worker, name="discord-notifier", daemon=True)
+            self.thread.start()
+
+    def close(self):
+        # 남은 알림을 모두 보낸 뒤 종료
+        if self.thread is not None:
+            self.queue.put((float('inf'), next(self.counter), None, None, None, None))
+            self.thread.join()
+            self.thread = None
+
+    def enqueue(self, webhook, embed, label, priority=PRIORITY_NORMAL, claim=None):
+        # claim: 전송에 실패하면 take_undelivered()로 돌려줄 값 (없으면 실패해도 돌려주지 않음)
+        self.queue.put((priority, next(self.counter), webhook, embed, label, claim))
+
+    def take_undelivered(self):
+        with self.lock:
+            undelivered = self.undelivered
+            self.undelivered = []
+            return undelivered
+
+    def drain(self, first):
+        # 큐에 쌓여있는 알림을 한 번에 꺼내서 (우선순위, 웹훅) 단위로 묶음
+        entries = [first]
+        while True:
+            try:
+                entries.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        entries.sort()
+
+        stop = any(entry[2] is None for entry in entries)
+        batches = []
+        for priority, _, webhook, embed, label, claim in entries:
+            if webhook is None:
+                continue
+            last = batches[-1] if batches else None
+            if (last and last["webhook"] == webhook and last["priority"] == priority
+                    and len(last["embeds"]) < MAX_EMBEDS and last["size"] + embed_size(embed) <= MAX_EMBED_CHARS):
+                last["embeds"].append(embed)
+                last["labels"].append(label)
+                last["claims"].append(claim)
+                last["size"] += embed_size(embed)
+            else:
+                batches.append({"priority": priority, "webhook": webhook, "embeds": [embed], "labels": [label], "claims": [claim],
+                                "size": embed_size(embed)})
+        return batches, stop
+
+    def worker(self):
+        while True:
+            batches, stop = self.drain(self.queue.get())
+            for batch in batches:
+                self.send(batch)
+            if stop:
+                break
+
+    def send(self, batch):
+        labels = ", ".join(sorted(set(batch["labels"])))
+        data = json.dumps({"embeds": batch["embeds"]})
+        permanent = False
+        for attempt in range(self.max_retries):
+            METRICS.inc("requests_total", target="webhook")
+            try:
+                with METRICS.span("webhook", labels=labels, embeds=len(batch["embeds"]), attempt=attempt):
+                    response = self.session.post(batch["webhook"], data=data)
+            except Exception as e:
+                print(f"[send_discord_message] 메시지 전송 중 오류 발생: {e}")
+                traceback.print_exc()
+                METRICS.inc("retries_total", reason="network")
+                time.sleep(self.backoff * (2 ** attempt))
+                continue
+
+            if response.status_code == 204 or response.status_code == 200:
+                self.sent += len(batch["embeds"])
+                METRICS.inc("alerts_sent_total", len(batch["embeds"]))
+                print(f"[{datetime.now(KST)}] {labels} - 메시지 {len(batch['embeds'])}개가 성공적으로 전송되었습니다.")
+                return True
+            if response.status_code == 429:
+                # 디스코드가 알려주는 retry_after(초)만큼 기다린 뒤 재전송
+                try:
+                    retry_after = float(response.json().get("retry_after", 1.0))
+                except ValueError:
+                    retry_after = float(response.headers.get("Retry-After", 1.0))
+                print(f"[!] 디스코드 전송 제한 - {retry_after:.2f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+                METRICS.inc("retries_total", reason="rate_limit")
+                time.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                print(f"메시지 전송 실패. 상태 코드: {response.status_code} - 재시도 ({attempt + 1}/{self.max_retries})")
+                METRICS.inc("retries_total", reason="server_error")
+                time.sleep(self.backoff * (2 ** attempt))
+                continue
+
+            # 그 외 4xx는 재시도해도 같은 결과이므로 포기
+            print(f"메시지 전송 실패. 상태 코드: {response.status_code} - {response.text}")
+            permanent = True
+            break
+
+        self.failed += len(batch["embeds"])
+        METRICS.inc("alerts_failed_total", len(batch["embeds"]))
+        print(f"[x] {labels} - 메시지 {len(batch['embeds'])}개 전송 실패")
+        if not permanent:
+            # 재시도 횟수를 다 쓴 일시적인 실패만 돌려줌 (4xx는 다시 보내도 같은 결과이므로 매 사이클 반복하지 않음)
+            with self.lock:
+                self.undelivered.extend(claim for claim in batch["claims"] if claim is not None)
+        return False
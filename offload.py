@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from listing import OPTIONS, Listing, from_api, from_auction
+from parsers import get_parser
+
+# 워커 프로세스에서 파서 이름 -> 파서 함수 (프로세스마다 한 번만 찾음)
+_parsers = {}
+
+
+def to_row(listing):
+    # Listing -> 프로세스 간에 주고받는 튜플. 옵션은 프로세스마다 다른 OPTIONS id 대신 (문자열, 비교 키)로 보냄
+    return (listing.name, listing.grade_quality, listing.trade_count,
+            tuple((OPTIONS.texts[option_id], OPTIONS.keys[option_id]) for option_id in listing.options),
+            listing.end_ms, listing.price, listing.start_price, listing.bid_price, listing.icon, listing.page_no,
+            listing.key, listing.product_id, listing._alert_id, listing._fingerprint)
+
+
+def from_row(row):
+    # to_row 튜플 -> 이 프로세스의 OPTIONS로 다시 인턴한 Listing
+    (name, quality, trade_count, options, end_ms, price, start_price, bid_price, icon, page_no,
+     key, product_id, alert_id, fingerprint) = row
+    return Listing(name, quality, trade_count, tuple(OPTIONS.intern(text, option_key) for text, option_key in options),
+                   end_ms, price, start_price=start_price, bid_price=bid_price, icon=icon, page_no=page_no, key=key,
+                   product_id=product_id, alert_id=alert_id, fingerprint=fingerprint)
+
+
+def api_rows(pages):
+    # API 페이지 목록 [(page_no, Items)] -> 매물 튜플 목록 (run.py to_listings와 같은 결과)
+    rows = []
+    for page_no, items_list in pages:
+        for item in items_list:
+            listing = from_api(item, page_no)
+            if listing is not None:
+                rows.append(to_row(listing))
+    return rows
+
+
+def site_rows(parser, html, now=None):
+    # 사이트 검색 결과 HTML -> 매물 튜플 목록 (fingerprint까지 계산해서 보냄)
+    parse = _parsers.get(parser)
+    if parse is None:
+        parse = _parsers[parser] = get_parser(parser)
+    return [to_row(from_auction(result)) for result in parse(html, now)]
+
+
+def ready(_):
+    # 프로세스는 놀고 있는 워커가 없을 때만 하나씩 더 뜨므로 잠깐 머물러서 workers개가 모두 뜨게 함
+    time.sleep(0.1)
+    return os.getpid()
+
+
+class Offload:
+    # config "offload_workers": 사이트 HTML 파싱과 API 응답 -> Listing 변환을 별도 프로세스에서 실행
+    # 메인 프로세스의 GIL을 잡지 않으므로 변환하는 동안에도 크롤러 스레드의 요청이 계속 진행됨
+    # (스레드가 도는 중에 fork하지 않도록 spawn으로 띄움. 워커는 run.py를 __mp_main__으로 import만 하고 main()은 실행하지 않음)
+    def __init__(self, workers, parser='auto'):
+        self.workers = workers
+        self.parser = parser
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self):
+        # 첫 사이클에 프로세스 기동 시간이 섞이지 않도록 미리 띄움
+        pids = set(self.executor.map(ready, range(self.workers)))
+        print(f"[+] 변환 프로세스 {len(pids)}개 시작")
+
+    def submit_api(self, pages):
+        return self.executor.submit(api_rows, pages)
+
+    def submit_site(self, html, now=None):
+        return self.executor.submit(site_rows, self.parser, html, now)
+
+    def site_listings(self, html):
+        return [from_row(row) for row in self.submit_site(html).result()]
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,84 @@
+import math
+
+# 기존 run.py 루프의 "cnt <= 30" 제한 (페이지 크기 10 기준 4페이지)과 동일
+DEFAULT_MAX_PAGES = 4
+DEFAULT_BAND = 1.15
+
+MODES = ('full', 'threshold')
+
+
+def page_min_price(items_list):
+    prices = [item.get("AuctionInfo", {}).get("BuyPrice") for item in items_list]
+    prices = [price for price in prices if price is not None]
+    return min(prices) if prices else None
+
+
+def page_max_price(items_list):
+    prices = [item.get("AuctionInfo", {}).get("BuyPrice") for item in items_list]
+    prices = [price for price in prices if price is not None]
+    return max(prices) if prices else None
+
+
+class PagePlan:
+    def __init__(self, mode='full', max_pages=DEFAULT_MAX_PAGES, band=DEFAULT_BAND):
+        if mode not in MODES:
+            raise ValueError(f"알 수 없는 페이지 모드: {mode}")
+        self.mode = mode
+        self.max_pages = max(1, int(max_pages))
+        self.band = band
+
+    def last_page(self, total_count, page_size):
+        if page_size <= 0:
+            return 1
+        return max(1, min(math.ceil(total_count / page_size), self.max_pages))
+
+    def remaining_pages(self, total_count, page_size):
+        # full 모드: 1페이지의 TotalCount/PageSize로 나머지 페이지를 한 번에 계산해서 병렬 요청
+        return list(range(2, self.last_page(total_count, page_size) + 1))
+
+    def threshold_price(self, first_page):
+        lowest = page_min_price(first_page)
+        return None if lowest is None else lowest * self.band
+
+    def wants_next(self, page_no, items_list, threshold, total_count, page_size):
+        # threshold 모드: BUY_PRICE 오름차순이므로 이 페이지의 최고가가 알림 구간을 넘으면
+        # 다음 페이지의 최저가도 구간 밖이라 더 가져올 필요가 없음
+        if page_no >= self.last_page(total_count, page_size):
+            return False
+        if threshold is None:
+            return True
+        highest = page_max_price(items_list)
+        return highest is None or highest <= threshold
+
+    def covers(self, items, page_size):
+        # 묶음 검색에서 걸러낸 목록(가격 오름차순)이 이 조건 단독 검색 결과를 모두 포함하는지
+        if page_size <= 0:
+            return False
+        if len(items) >= self.max_pages * page_size:
+            return True
+        if self.mode == 'threshold' and items:
+            # 단독 검색도 구간을 넘는 페이지까지는 한 페이지 전체를 받으므로 그 페이지가 다 차야 함
+            pages = self.split_pages(items, page_size)
+            threshold = self.threshold_price(pages[0][1])
+            page_no, items_list = pages[-1]
+            highest = page_max_price(items_list)
+            return threshold is not None and highest is not None and highest > threshold and len(items_list) == page_size
+        return False
+
+    def split_pages(self, items, page_size):
+        # 걸러낸 목록을 단독 검색했을 때와 같은 (page_no, items_list) 단위로 나눔
+        pages = []
+        threshold = None
+        for start in range(0, len(items), page_size):
+            page_no = start // page_size + 1
+            if page_no > self.max_pages:
+                break
+            items_list = items[start:start + page_size]
+            pages.append((page_no, items_list))
+            if self.mode == 'threshold':
+                if threshold is None:
+                    threshold = self.threshold_price(items_list)
+                highest = page_max_price(items_list)
+                if threshold is not None and highest is not None and highest > threshold:
+                    break
+        return pages
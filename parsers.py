@@ -0,0 +1,352 @@
+import json
+import re
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+from matching import auction_fingerprint
+
+try:
+    import lxml.html
+except ImportError:  # lxml이 없으면 stream 파서 사용
+    lxml = None
+
+CLEAN_HTML_RE = re.compile('<.*?>')
+
+
+def clean_html(raw_html):
+    cleantext = re.sub(CLEAN_HTML_RE, '', raw_html)
+    return cleantext.strip()
+
+def parse_time(time_str):
+    if '시간' in time_str and '분' in time_str:
+        hours, minutes = re.search(r'(\d+)시간\s*(\d+)분', time_str).groups()
+        return timedelta(hours=int(hours), minutes=int(minutes))
+    elif '시간' in time_str:
+        hours = re.search(r'(\d+)시간', time_str).group(1)
+        return timedelta(hours=int(hours))
+    elif '분' in time_str:
+        minutes = re.search(r'(\d+)분', time_str).group(1)
+        return timedelta(minutes=int(minutes))
+    return timedelta()
+
+def parse_trade_count(text):
+    if '불가' in text:
+        return 0
+    match = re.search(r'(\d+)회', text)
+    if match:
+        return int(match.group(1))
+    return 0  # 기본값으로 0 반환
+
+
+def build_auction_item(fields, now):
+    # 모든 파서가 행에서 뽑아낸 원본 문자열(fields)을 같은 방식으로 변환해서 결과가 동일하도록 함
+    item = {}
+
+    # 아이템 이름
+    item['Name'] = fields['name'].strip()
+
+    # 등급, 티어, 레벨, 아이콘
+    item['Grade'] = fields['data-grade']
+    item['Tier'] = int(fields['data-tier'])
+    item['Level'] = int(fields['data-itemlevel'])
+    item['Icon'] = fields['data-itempath']
+
+    # 품질
+    if fields.get('quality') is not None:
+        item['GradeQuality'] = int(fields['quality'])
+
+    # 경매 정보
+    item['AuctionInfo'] = {}
+    if fields.get('price_row'):
+        start_price = int(fields['start'].replace(',', ''))
+        current_bid = int(fields['bid'].replace(',', ''))
+        item['AuctionInfo']['StartPrice'] = start_price
+        item['AuctionInfo']['BidPrice'] = current_bid
+        item['AuctionInfo']['BidStartPrice'] = start_price
+
+    if fields.get('buy') is not None:
+        item['AuctionInfo']['BuyPrice'] = int(fields['buy'].replace(',', ''))
+
+    # 남은 시간
+    if fields.get('time') is not None:
+        item['AuctionInfo']['EndDate'] = (now + parse_time(fields['time'].strip())).isoformat()
+
+    # 거래 가능 횟수
+    if fields.get('count') is not None:
+        item['AuctionInfo']['TradeAllowCount'] = parse_trade_count(fields['count'].strip())
+    else:
+        item['AuctionInfo']['TradeAllowCount'] = 0  # 정보가 없는 경우 기본값 0
+
+    # 아이템 옵션
+    options = json.loads(fields['data-optionjson'])
+    item['Options'] = []
+    for option in options:
+        option_name = clean_html(option['secondOptionText'])
+        option_value = option['optionValue']
+        option_type = 'ARK_PASSIVE' if option['optionType'] == 8 else 'ACCESSORY_UPGRADE'
+        item['Options'].append({
+            'Type': option_type,
+            'OptionName': option_name,
+            'OptionNameTripod': '',
+            'Value': float(option_value),
+            'IsPenalty': False,
+            'ClassName': None,
+            'IsValuePercentage': option_type == 'ACCESSORY_UPGRADE'
+        })
+
+    # 아이템 고유 번호
+    item['ProductId'] = fields['productid']
+
+    # 매칭용 fingerprint는 파싱할 때 한 번만 계산
+    item['Fingerprint'] = auction_fingerprint(item)
+    return item
+
+
+HISTORY_ATTRS = ('data-grade', 'data-tier', 'data-itemlevel', 'data-itempath', 'data-optionjson')
+
+
+def parse_auction_items_bs4(html, now=None):
+    now = now or datetime.now()
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+    for row in soup.select('table.auctionListTable tbody tr'):
+        fields = {}
+        fields['name'] = row.select_one('span.name').text
+
+        button = row.select_one('button.button--deal-history')
+        for attr in HISTORY_ATTRS:
+            fields[attr] = button[attr]
+
+        quality = row.select_one('div.quality span.txt')
+        if quality:
+            fields['quality'] = quality.text
+
+        price_row = row.select_one('div.price-row')
+        if price_row:
+            fields['price_row'] = True
+            fields['start'] = price_row.select_one('em').text
+            fields['bid'] = price_row.select_one('span.tooltip em').text
+
+        buy_price = row.select_one('div.price-buy em')
+        if buy_price:
+            fields['buy'] = buy_price.text
+
+        time_left = row.select_one('div.time')
+        if time_left:
+            fields['time'] = time_left.text
+
+        trade_count_elem = row.select_one('span.count')
+        if trade_count_elem:
+            fields['count'] = trade_count_elem.text
+
+        fields['productid'] = row.select_one('button.button--deal-buy')['data-productid']
+        items.append(build_auction_item(fields, now))
+
+    return items
+
+
+def xpath_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# lxml 경로에서 사용하는 XPath (bs4 CSS 선택자와 같은 의미)
+LXML_XPATHS = {
+    'rows': f'//table[{xpath_class("auctionListTable")}]//tbody//tr',
+    'name': f'.//span[{xpath_class("name")}]',
+    'history': f'.//button[{xpath_class("button--deal-history")}]',
+    'quality': f'.//div[{xpath_class("quality")}]//span[{xpath_class("txt")}]',
+    'price_row': f'.//div[{xpath_class("price-row")}]',
+    'bid': f'.//span[{xpath_class("tooltip")}]//em',
+    'buy': f'.//div[{xpath_class("price-buy")}]//em',
+    'time': f'.//div[{xpath_class("time")}]',
+    'count': f'.//span[{xpath_class("count")}]',
+    'buy_button': f'.//button[{xpath_class("button--deal-buy")}]',
+}
+
+
+def first(element, path):
+    found = element.xpath(path)
+    return found[0] if found else None
+
+
+def parse_auction_items_lxml(html, now=None):
+    now = now or datetime.now()
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    doc = lxml.html.fromstring(html, parser=lxml.html.HTMLParser(encoding='utf-8'))
+    items = []
+    for row in doc.xpath(LXML_XPATHS['rows']):
+        fields = {}
+        fields['name'] = first(row, LXML_XPATHS['name']).text_content()
+
+        button = first(row, LXML_XPATHS['history'])
+        for attr in HISTORY_ATTRS:
+            fields[attr] = button.get(attr)
+
+        quality = first(row, LXML_XPATHS['quality'])
+        if quality is not None:
+            fields['quality'] = quality.text_content()
+
+        price_row = first(row, LXML_XPATHS['price_row'])
+        if price_row is not None:
+            fields['price_row'] = True
+            fields['start'] = first(price_row, './/em').text_content()
+            fields['bid'] = first(price_row, LXML_XPATHS['bid']).text_content()
+
+        buy_price = first(row, LXML_XPATHS['buy'])
+        if buy_price is not None:
+            fields['buy'] = buy_price.text_content()
+
+        time_left = first(row, LXML_XPATHS['time'])
+        if time_left is not None:
+            fields['time'] = time_left.text_content()
+
+        trade_count_elem = first(row, LXML_XPATHS['count'])
+        if trade_count_elem is not None:
+            fields['count'] = trade_count_elem.text_content()
+
+        fields['productid'] = first(row, LXML_XPATHS['buy_button']).get('data-productid')
+        items.append(build_auction_item(fields, now))
+
+    return items
+
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+
+class AuctionTableTokenizer(HTMLParser):
+    # auctionListTable 안의 필요한 요소만 추적하는 스트리밍 파서 (DOM 트리를 만들지 않음)
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []      # 열린 요소의 (tag, classes)
+        self.table_depth = None
+        self.row_depth = None
+        self.fields = None
+        self.captures = []   # 텍스트를 모으는 중인 [(key, depth)]
+        self.texts = {}
+        self.rows = []
+
+    def inside(self, tag, cls):
+        for open_tag, classes in self.stack[self.row_depth:]:
+            if open_tag == tag and cls in classes:
+                return True
+        return False
+
+    def capture(self, key):
+        if key not in self.texts:
+            self.texts[key] = []
+            self.captures.append((key, len(self.stack)))
+
+    def handle_starttag(self, tag, attrs):
+        classes = ()
+        attr_map = dict(attrs)
+        if attr_map.get('class'):
+            classes = attr_map['class'].split()
+
+        if self.table_depth is None:
+            if tag == 'table' and 'auctionListTable' in classes:
+                self.table_depth = len(self.stack)
+        elif self.row_depth is None:
+            if tag == 'tr' and any(open_tag == 'tbody' for open_tag, _ in self.stack[self.table_depth:]):
+                self.row_depth = len(self.stack) + 1
+                self.fields = {}
+                self.texts = {}
+        else:
+            self.start_in_row(tag, classes, attr_map)
+
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, classes))
+
+    def start_in_row(self, tag, classes, attr_map):
+        fields = self.fields
+        if tag == 'span':
+            if 'name' in classes:
+                self.capture('name')
+            if 'txt' in classes and self.inside('div', 'quality'):
+                self.capture('quality')
+            if 'count' in classes:
+                self.capture('count')
+        elif tag == 'div':
+            if 'price-row' in classes and 'price_row' not in fields:
+                fields['price_row'] = True
+            if 'time' in classes:
+                self.capture('time')
+        elif tag == 'em':
+            if self.inside('div', 'price-row'):
+                self.capture('start')
+                if self.inside('span', 'tooltip'):
+                    self.capture('bid')
+            if self.inside('div', 'price-buy'):
+                self.capture('buy')
+        elif tag == 'button':
+            if 'button--deal-history' in classes and 'data-grade' not in fields:
+                for attr in HISTORY_ATTRS:
+                    fields[attr] = attr_map.get(attr)
+            if 'button--deal-buy' in classes and 'productid' not in fields:
+                fields['productid'] = attr_map.get('data-productid')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        # 닫히지 않은 요소가 있으면 일치하는 태그까지 함께 닫음
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                break
+        else:
+            return
+        del self.stack[index:]
+        depth = len(self.stack)
+
+        self.captures = [(key, capture_depth) for key, capture_depth in self.captures if capture_depth < depth]
+        if self.row_depth is not None and depth < self.row_depth:
+            self.finish_row()
+        if self.table_depth is not None and depth <= self.table_depth:
+            self.table_depth = None
+
+    def handle_data(self, data):
+        for key, _ in self.captures:
+            self.texts[key].append(data)
+
+    def finish_row(self):
+        for key, parts in self.texts.items():
+            self.fields[key] = ''.join(parts)
+        self.rows.append(self.fields)
+        self.row_depth = None
+        self.fields = None
+        self.texts = {}
+        self.captures = []
+
+
+def parse_auction_items_stream(html, now=None):
+    now = now or datetime.now()
+    tokenizer = AuctionTableTokenizer()
+    tokenizer.feed(html)
+    tokenizer.close()
+    return [build_auction_item(fields, now) for fields in tokenizer.rows]
+
+
+PARSERS = {
+    'bs4': parse_auction_items_bs4,
+    'lxml': parse_auction_items_lxml,
+    'stream': parse_auction_items_stream,
+}
+
+
+def available_parsers():
+    return [name for name in PARSERS if name != 'lxml' or lxml is not None]
+
+
+def get_parser(name='auto'):
+    if name == 'auto':
+        name = 'lxml' if lxml is not None else 'stream'
+    if name not in available_parsers():
+        raise ValueError(f"사용할 수 없는 파서: {name}")
+    return PARSERS[name]
+
@@ -0,0 +1,130 @@
+from conditions import option_tuple
+
+VALUE_EPSILON = 1e-6
+
+
+def parse_display_value(text):
+    # "2.60%" -> 2.6
+    try:
+        return float(str(text).replace('%', '').replace(',', '').strip())
+    except ValueError:
+        return None
+
+
+class OptionPredicate:
+    def __init__(self, name, allowed=None, min_value=None, max_value=None):
+        self.name = name
+        self.allowed = allowed  # 등급(하/중/상)별 표시값 목록. 없으면 min/max 범위로 비교
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def accepts(self, value):
+        if self.allowed is not None:
+            return any(abs(value - allowed) < VALUE_EPSILON for allowed in self.allowed)
+        return self.min_value - VALUE_EPSILON <= value <= self.max_value + VALUE_EPSILON
+
+    def matches(self, item):
+        for option in item.get("Options", []):
+            if (option.get("OptionName") or "").strip() == self.name and option.get("Value") is not None:
+                if self.accepts(float(option["Value"])):
+                    return True
+        return False
+
+
+class ConditionFilter:
+    def __init__(self, predicates):
+        self.predicates = predicates
+
+    def matches(self, item):
+        return all(predicate.matches(item) for predicate in self.predicates)
+
+
+class OptionCatalog:
+    def __init__(self, data):
+        # /auctions/options 응답의 EtcOptions로 (FirstOption, SecondOption) -> (옵션 이름, 등급별 표시값) 매핑
+        self.options = {}
+        for etc in data.get("EtcOptions") or []:
+            for sub in etc.get("EtcSubs") or []:
+                values = {}
+                for etc_value in sub.get("EtcValues") or []:
+                    display = parse_display_value(etc_value.get("DisplayValue"))
+                    if display is not None:
+                        values[etc_value.get("Value")] = display
+                self.options[(etc.get("Value"), sub.get("Value"))] = ((sub.get("Text") or "").strip(), values)
+
+    @classmethod
+    def fetch(cls, session, url):
+        response = session.get(url)
+        response.raise_for_status()
+        return cls(response.json())
+
+    def predicate(self, option):
+        # option은 (FirstOption, SecondOption, MinValue, MaxValue)
+        # 로컬에서 확인할 수 없는 옵션이면 None (해당 조건은 묶지 않음)
+        first, second, min_value, max_value = option
+        entry = self.options.get((first, second))
+        if entry is None or not entry[0]:
+            return None
+        name, values = entry
+        if values:
+            allowed = [display for value, display in values.items()
+                       if isinstance(value, (int, float)) and min_value <= value <= max_value]
+            if not allowed:
+                return None
+            return OptionPredicate(name, allowed=allowed)
+        return OptionPredicate(name, min_value=min_value, max_value=max_value)
+
+
+class QueryGroup:
+    def __init__(self, query, members):
+        self.query = query        # 공통 옵션만 남긴 API 요청 바디
+        self.members = members    # condition_name -> ConditionFilter
+
+    @property
+    def name(self):
+        return " + ".join(self.members)
+
+
+def plan_queries(conditions, catalog):
+    # 카테고리/티어/등급/품질 등이 같은 조건을 공통 EtcOptions만으로 한 번에 검색하고,
+    # 조건별로 다른 옵션은 가져온 아이템에서 직접 확인하도록 묶음
+    # conditions는 name -> Condition (group_key/options는 로드 시 미리 계산됨)
+    buckets = {}
+    for name, condition in conditions.items():
+        buckets.setdefault(condition.group_key, []).append(name)
+
+    groups = []
+    singles = []
+    for names in buckets.values():
+        if catalog is None or len(names) < 2:
+            singles.extend(names)
+            continue
+
+        option_sets = [set(conditions[name].options) for name in names]
+        common = set.intersection(*option_sets)
+
+        members = {}
+        for name in names:
+            predicates = []
+            for option in conditions[name].options:
+                if option in common:
+                    continue
+                predicate = catalog.predicate(option)
+                if predicate is None:
+                    predicates = None
+                    break
+                predicates.append(predicate)
+            if predicates is None:
+                singles.append(name)
+            else:
+                members[name] = ConditionFilter(predicates)
+
+        if len(members) < 2:
+            singles.extend(members)
+            continue
+
+        first = conditions[next(iter(members))].query
+        query = dict(first, EtcOptions=[option for option in first["EtcOptions"] if option_tuple(option) in common])
+        groups.append(QueryGroup(query, members))
+
+    return groups, singles
@@ -0,0 +1,83 @@
+import heapq
+import itertools
+from bisect import bisect_left, bisect_right, insort
+
+from dedupe import now_ms
+
+
+class PriceIndex:
+    # 한 조건의 매물을 즉시 구매가 오름차순으로 유지하는 색인
+    # 최저가/알림 구간 조회는 이분 탐색, 종료된 매물은 종료 시간 힙으로 조회 시점에 제거
+    # 가격이나 종료 시간이 없는 매물은 알림 대상이 아니므로 색인에 넣지 않음
+    def __init__(self, items=()):
+        self.entries = []   # (price, seq, key) 오름차순
+        self.live = {}      # key -> (price, seq, Listing)
+        self.expiry = []    # (end_ms, seq, key) 힙
+        self.seq = itertools.count()
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.live)
+
+    def add(self, item):
+        if item.price is None or item.end_ms is None:
+            return
+        if item.key in self.live:
+            self.discard(item.key)
+        seq = next(self.seq)
+        self.live[item.key] = (item.price, seq, item)
+        insort(self.entries, (item.price, seq, item.key))
+        heapq.heappush(self.expiry, (item.end_ms, seq, item.key))
+
+    def update(self, item):
+        # 이번 스냅샷의 Listing으로 교체. 가격이 같으면 정렬 위치는 그대로 두고 참조만 바꿈 (페이지 번호 등 최신 값 유지)
+        if item.price is None or item.end_ms is None:
+            self.discard(item.key)
+            return
+        entry = self.live.get(item.key)
+        if entry is not None and entry[0] == item.price:
+            self.live[item.key] = (entry[0], entry[1], item)
+        else:
+            self.add(item)
+
+    def discard(self, key):
+        entry = self.live.pop(key, None)
+        if entry is None:
+            return
+        price, seq, _ = entry
+        index = bisect_left(self.entries, (price, seq, key))
+        del self.entries[index]
+        # 힙에 남은 항목은 seq가 맞지 않으므로 expire()에서 무시됨
+
+    def expire(self, now):
+        # 종료 시간이 지난 매물을 제거 (힙의 맨 앞만 확인하므로 지난 게 없으면 바로 끝남)
+        expiry = self.expiry
+        while expiry and expiry[0][0] <= now:
+            _, seq, key = heapq.heappop(expiry)
+            entry = self.live.get(key)
+            if entry is not None and entry[1] == seq:
+                self.discard(key)
+
+    def lowest(self, now=None):
+        self.expire(now_ms() if now is None else now)
+        if not self.entries:
+            return None
+        price, _, key = self.entries[0]
+        return self.live[key][2]
+
+    def within(self, max_price, now=None):
+        # max_price 이하 매물 (가격 오름차순)
+        self.expire(now_ms() if now is None else now)
+        end = bisect_right(self.entries, (max_price, float('inf')))
+        return [self.live[key][2] for _, _, key in self.entries[:end]]
+
+    def count(self, now=None):
+        self.expire(now_ms() if now is None else now)
+        return len(self.entries)
+
+    def compact(self):
+        # 가격 변경/삭제로 힙에 쌓인 무효 항목이 많아지면 다시 만듦
+        if len(self.expiry) > 2 * len(self.live) + 64:
+            self.expiry = [(item.end_ms, seq, key) for key, (_, seq, item) in self.live.items()]
+            heapq.heapify(self.expiry)
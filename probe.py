@@ -0,0 +1,81 @@
+import hashlib
+
+from metrics import METRICS
+
+# 1페이지가 바뀌지 않아도 이 횟수만큼 연속으로 건너뛰면 한 번은 전체를 다시 수집
+# (1페이지 밖에서만 생긴 변화가 TotalCount로 드러나지 않는 경우 대비)
+DEFAULT_MAX_SKIPS = 10
+
+# 건너뛴 조건의 결과 자리에 들어가는 값 (None은 수집 실패)
+UNCHANGED = "unchanged"
+
+
+def page_fingerprint(response):
+    # 1페이지 응답의 TotalCount와 매물별 (가격, 종료 시간, 옵션)으로 만든 해시
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(response.get("TotalCount", 0)).encode())
+    for item in response.get("Items") or []:
+        auction_info = item.get("AuctionInfo") or {}
+        options = ",".join(f"{option.get('OptionName')}={option.get('Value')}" for option in item.get("Options") or [])
+        digest.update(f"\n{item.get('Name')}|{item.get('GradeQuality')}|{auction_info.get('BuyPrice')}|{auction_info.get('StartPrice')}|"
+                      f"{auction_info.get('BidPrice')}|{auction_info.get('TradeAllowCount')}|{auction_info.get('EndDate')}|{options}".encode())
+    return digest.digest()
+
+
+class ChangeProbe:
+    # 조건별로 지난 사이클 1페이지의 fingerprint를 기억했다가 같으면 나머지 페이지와 비교/알림을 건너뜀
+    # fingerprint는 그 조건의 처리가 끝난 뒤(commit)에만 확정해서, 처리하지 못한 변경을 건너뛰지 않도록 함
+    def __init__(self, max_skips=DEFAULT_MAX_SKIPS):
+        self.max_skips = max_skips
+        self.fingerprints = {}  # condition -> 마지막으로 처리한 1페이지 fingerprint
+        self.pending = {}       # condition -> 이번 사이클에 받은 fingerprint (처리 후 commit)
+        self.skips = {}         # condition -> 연속으로 건너뛴 횟수
+        self.pages = {}         # condition -> 마지막 전체 수집 때 받은 페이지 수
+        self.probes = 0
+        self.skipped = 0
+        self.changed = 0
+        self.forced = 0
+        self.saved = 0
+
+    def unchanged(self, condition, response):
+        # 1페이지 응답을 보고 이 조건의 나머지 작업을 건너뛸지 결정
+        fingerprint = page_fingerprint(response)
+        self.probes += 1
+        if self.fingerprints.get(condition) == fingerprint:
+            skips = self.skips.get(condition, 0)
+            if skips < self.max_skips:
+                self.skips[condition] = skips + 1
+                self.skipped += 1
+                saved = max(0, self.pages.get(condition, 1) - 1)
+                self.saved += saved
+                METRICS.inc("probe_total", result="skip")
+                METRICS.inc("probe_saved_requests_total", saved)
+                return True
+            self.forced += 1
+            METRICS.inc("probe_total", result="forced")
+        else:
+            self.changed += 1
+            METRICS.inc("probe_total", result="changed")
+        self.pending[condition] = fingerprint
+        return False
+
+    def commit(self, condition, pages):
+        fingerprint = self.pending.pop(condition, None)
+        if fingerprint is not None:
+            self.fingerprints[condition] = fingerprint
+            self.skips[condition] = 0
+            self.pages[condition] = len(pages)
+
+    def discard(self, condition):
+        # 일부 페이지 수집에 실패했거나 처리 중 오류가 나면 다음 사이클에 다시 전체 수집
+        self.pending.pop(condition, None)
+        self.fingerprints.pop(condition, None)
+
+    def stats(self):
+        return {
+            "probes": self.probes,
+            "skipped": self.skipped,
+            "changed": self.changed,
+            "forced": self.forced,
+            "saved_requests": self.saved,
+        }
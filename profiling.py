@@ -0,0 +1,198 @@
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from metrics import METRICS
+
+# KST 시간대 정의
+KST = timezone(timedelta(hours=9))
+
+# 릴리스 간 비교할 때 기본으로 보는 함수 (parse_auction_items는 parse_auction_items_lxml 등 파서별 함수까지 포함)
+HOT_FUNCTIONS = ("parse_auction_items", "items_match", "find", "parse_end_ms", "from_api", "from_auction", "write_delta",
+                 "process_condition")
+# 메모리 추적은 파싱/DB 반영 단계에서만 (METRICS.span 이름 기준)
+MEMORY_STAGES = ("parse_auction_items", "db_write")
+SAMPLE_INTERVAL = 0.005
+# 작업 없이 대기 중인 보조 스레드의 스택 끝 (스레드 풀/디스코드 전송 스레드의 유휴 샘플은 버림)
+IDLE_LEAVES = ("thread.py:_worker", "threading.py:wait")
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    # 모든 스레드의 호출 스택을 주기적으로 샘플링해서 collapsed stack 형식으로 집계
+    # (cProfile은 메인 스레드만 보므로 크롤러 스레드 풀의 API 요청 대기까지 보려면 샘플링이 필요)
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def loop(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (ident != main and frame_label(frame) in IDLE_LEAVES):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        # flamegraph.pl / speedscope 에서 바로 읽을 수 있는 "a;b;c 횟수" 형식
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class AllocationTracer:
+    # METRICS.span 단계 동안만 tracemalloc을 켜서, 단계가 끝날 때 남아 있는 할당을 위치별로 누적
+    # (전체 힙 스냅샷 비교보다 훨씬 가벼움). 스냅샷을 뜨는 동안은 cProfile을 잠시 끔
+    def __init__(self, profile=None, stages=MEMORY_STAGES, frames=1):
+        self.profile = profile
+        self.stages = set(stages)
+        self.frames = frames
+        self.sizes = {}  # stage -> Counter(위치 -> 남은 바이트)
+        self.peaks = {}
+
+    @contextmanager
+    def trace(self, stage):
+        if stage not in self.stages or tracemalloc.is_tracing():
+            yield
+            return
+        tracemalloc.start(self.frames)
+        try:
+            yield
+        finally:
+            if self.profile:
+                self.profile.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            sizes = self.sizes.setdefault(stage, Counter())
+            for stat in snapshot.statistics("lineno"):
+                frame = stat.traceback[0]
+                # 추적/샘플링 코드 자체의 할당은 제외
+                if frame.filename not in (tracemalloc.__file__, __file__):
+                    sizes[f"{frame.filename}:{frame.lineno}"] += stat.size
+            self.peaks[stage] = max(self.peaks.get(stage, 0), peak)
+            if self.profile:
+                self.profile.enable()
+
+    def write(self, path, top):
+        with open(path, "w", encoding="utf-8") as f:
+            for stage in sorted(self.sizes):
+                f.write(f"[{stage}] 최대 사용량 {self.peaks.get(stage, 0) / 1024:.1f} KiB, 단계 종료 시 남은 할당 위치 상위 {top}개\n")
+                for location, size in self.sizes[stage].most_common(top):
+                    f.write(f"    {size / 1024:10.1f} KiB  {location}\n")
+                f.write("\n")
+
+
+class CycleProfiler:
+    # run.py --profile DIR: every 번째 사이클마다 cProfile(pstats) + 전체 스레드 스택 샘플(collapsed)을 저장
+    # memory=True면 파싱/DB 반영 단계의 tracemalloc 상위 N개 할당 위치도 함께 저장
+    def __init__(self, directory, every=1, memory=False, top=20, interval=SAMPLE_INTERVAL):
+        self.directory = directory
+        self.every = max(1, int(every))
+        self.memory = memory
+        self.top = top
+        self.interval = interval
+        self.cycle = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def run(self, func, *args):
+        self.cycle += 1
+        if (self.cycle - 1) % self.every:
+            return func(*args)
+
+        prefix = os.path.join(self.directory, f"cycle-{datetime.now(KST).strftime('%Y%m%d-%H%M%S')}-{self.cycle:04d}")
+        sampler = StackSampler(self.interval)
+        profile = cProfile.Profile()
+        tracer = AllocationTracer(profile) if self.memory else None
+        if tracer:
+            METRICS.tracer = tracer
+        sampler.start()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            if tracer:
+                METRICS.tracer = None
+            self.save(prefix, profile, sampler, tracer, elapsed)
+
+    def save(self, prefix, profile, sampler, tracer, elapsed):
+        profile.dump_stats(prefix + ".pstats")
+        sampler.write(prefix + ".collapsed")
+        if tracer:
+            tracer.write(prefix + ".memory.txt", self.top)
+        print(f"[+] 프로파일 저장: {prefix}.* ({elapsed:.2f}초, 스택 샘플 {sum(sampler.stacks.values())}개)")
+        stats = pstats.Stats(prefix + ".pstats")
+        for name, calls, total, cumulative in hot_functions(stats, HOT_FUNCTIONS):
+            print(f"    {name}: {calls}회, 자체 {total * 1000:.1f}ms, 누적 {cumulative * 1000:.1f}ms")
+
+
+def hot_functions(stats, names):
+    # pstats에서 이름이 일치하는 함수의 (이름, 호출 수, 자체 시간, 누적 시간). 같은 이름은 합산
+    totals = {}
+    for (filename, lineno, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        if any(function == name or function.startswith(name + "_") for name in names):
+            label = f"{os.path.basename(filename)}:{function}"
+            previous = totals.get(label, (0, 0.0, 0.0))
+            totals[label] = (previous[0] + calls, previous[1] + total, previous[2] + cumulative)
+    return [(label,) + values for label, values in sorted(totals.items(), key=lambda item: -item[1][2])]
+
+
+def compare(args):
+    # 두 릴리스의 pstats 파일에서 주요 함수의 시간을 나란히 비교
+    names = args.functions or HOT_FUNCTIONS
+    before = {row[0]: row[1:] for row in hot_functions(pstats.Stats(args.before), names)}
+    after = {row[0]: row[1:] for row in hot_functions(pstats.Stats(args.after), names)}
+    print(f"{'함수':<40} {'이전 호출':>10} {'이전 누적ms':>12} {'이후 호출':>10} {'이후 누적ms':>12} {'변화':>8}")
+    for label in sorted(set(before) | set(after)):
+        old = before.get(label, (0, 0.0, 0.0))
+        new = after.get(label, (0, 0.0, 0.0))
+        change = f"{(new[2] / old[2] - 1) * 100:+.0f}%" if old[2] else "-"
+        print(f"{label:<40} {old[0]:>10} {old[2] * 1000:>12.1f} {new[0]:>10} {new[2] * 1000:>12.1f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="run.py --profile 결과 비교")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_compare = sub.add_parser("compare", help="두 pstats 파일의 주요 함수 시간 비교")
+    p_compare.add_argument("before")
+    p_compare.add_argument("after")
+    p_compare.add_argument("--functions", nargs="+", help=f"비교할 함수 이름 (기본: {', '.join(HOT_FUNCTIONS)})")
+    args = parser.parse_args()
+    compare(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+import threading
+import time
+import requests
+
+from metrics import METRICS
+
+# developer-lostark API 기본 쿼터 (키당 분당 100회)
+DEFAULT_PER_MINUTE = 100
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds=60.0):
+        self.capacity = capacity
+        self.per_seconds = per_seconds
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def set_capacity(self, capacity):
+        if capacity > 0 and capacity != self.capacity:
+            self.capacity = capacity
+            self.rate = capacity / self.per_seconds
+            self.tokens = min(self.tokens, capacity)
+
+
+class ApiKey:
+    def __init__(self, token, per_minute=DEFAULT_PER_MINUTE, share=1):
+        self.token = token
+        # 같은 키를 여러 워커 프로세스가 함께 쓰면 쿼터를 share 등분해서 사용
+        self.share = share
+        self.bucket = TokenBucket(max(1, per_minute // share))
+        self.blocked_until = 0.0  # time.monotonic() 기준
+        self.remaining = None
+        self.requests = 0
+        self.throttled = 0
+
+        self.session = requests.session()
+        self.session.verify = False
+        self.session.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"bearer {token}"
+        }
+
+    @property
+    def name(self):
+        # 로그에는 토큰 앞부분만 노출
+        return f"{self.token[:8]}..."
+
+    def wait_time(self, now):
+        return max(self.bucket.wait_time(now), self.blocked_until - now)
+
+    def update_from_headers(self, headers, now):
+        # API가 내려주는 X-RateLimit-* 헤더로 로컬 버킷 상태를 보정
+        limit = headers.get("X-RateLimit-Limit")
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        try:
+            if limit is not None:
+                self.bucket.set_capacity(max(1, int(limit) // self.share))
+            if remaining is not None:
+                self.remaining = int(remaining)
+                self.bucket.tokens = min(self.bucket.tokens, self.remaining)
+                if self.remaining <= 0 and reset is not None:
+                    self.block_until_reset(reset, now)
+        except ValueError:
+            pass
+
+    def block_until_reset(self, reset, now):
+        # X-RateLimit-Reset 은 epoch 초 단위
+        wait = max(0.0, float(reset) - time.time())
+        self.blocked_until = max(self.blocked_until, now + wait)
+
+    def block_for(self, seconds, now):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class KeyPool:
+    def __init__(self, tokens, per_minute=DEFAULT_PER_MINUTE, max_retries=5, share=1):
+        if not tokens:
+            raise ValueError("API 토큰이 하나 이상 필요합니다.")
+        self.keys = [ApiKey(token, per_minute, share) for token in tokens]
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # 가장 빨리 사용 가능한 키를 골라 토큰 하나를 소비. 모든 키가 소진됐으면 대기
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                key = min(self.keys, key=lambda k: k.wait_time(now))
+                wait = key.wait_time(now)
+                if wait <= 0:
+                    key.bucket.take()
+                    key.requests += 1
+                    return key
+            time.sleep(min(wait, 1.0))
+
+    def request(self, method, url, **kwargs):
+        response = None
+        for attempt in range(self.max_retries):
+            key = self.acquire()
+            METRICS.inc("requests_total", target="api")
+            response = key.session.request(method, url, **kwargs)
+            with self.lock:
+                now = time.monotonic()
+                key.update_from_headers(response.headers, now)
+                if response.status_code != 429:
+                    return response
+                # 쿼터 초과: 해당 키를 리셋 시점까지 쉬게 하고 다른 키로 재시도
+                key.throttled += 1
+                retry_after = response.headers.get("Retry-After")
+                reset = response.headers.get("X-RateLimit-Reset")
+                if retry_after is not None:
+                    key.block_for(float(retry_after), now)
+                elif reset is not None:
+                    key.block_until_reset(reset, now)
+                else:
+                    key.block_for(60.0, now)
+            METRICS.inc("retries_total", reason="quota")
+            print(f"[!] API 쿼터 초과 ({key.name}) - 재시도 {attempt + 1}/{self.max_retries}")
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def stats(self):
+        with self.lock:
+            return [
+                {
+                    "key": key.name,
+                    "requests": key.requests,
+                    "throttled": key.throttled,
+                    "remaining": key.remaining,
+                }
+                for key in self.keys
+            ]
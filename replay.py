@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+# KST 시간대 정의
+KST = timezone(timedelta(hours=9))
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+KINDS = ('api', 'site', 'webhook')
+
+# 녹화 로그에 남기지 않을 값 (2차 비밀번호 키패드 입력값)
+REDACT_RE = re.compile(r'(password=)[^&]*')
+
+# 녹화된 응답이 없을 때 돌려줄 기본 응답
+DEFAULT_RESPONSES = {
+    'api': (200, 'application/json', json.dumps({"PageNo": 1, "PageSize": 10, "TotalCount": 0, "Items": []})),
+    'site': (200, 'text/html; charset=utf-8', '<table class="auctionListTable"><tbody></tbody></table>'),
+    'webhook': (204, 'text/plain', ''),
+}
+
+RECORDED_HEADERS = ('Content-Type', 'Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset')
+
+
+def classify(url):
+    parts = urlsplit(url)
+    if 'discord' in parts.netloc or '/webhooks/' in parts.path or parts.path.startswith('/webhook/'):
+        return 'webhook'
+    if parts.path.startswith('/auctions/') or 'developer-lostark' in parts.netloc:
+        return 'api'
+    return 'site'
+
+
+def canonical_body(body):
+    # JSON 바디는 키 순서와 무관하게 같은 요청으로 취급
+    if body is None:
+        return ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        return REDACT_RE.sub(r'\1***', body)
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def write(self, request, response, elapsed):
+        kind = classify(request.url)
+        parts = urlsplit(request.url)
+        entry = {
+            "ts": datetime.now(KST).isoformat(),
+            "kind": kind,
+            "method": request.method,
+            # 웹훅 URL에는 토큰이 들어있으므로 종류만 남김
+            "path": '/webhook' if kind == 'webhook' else parts.path + (f"?{parts.query}" if parts.query else ''),
+            "request": canonical_body(request.body),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            "body": response.content.decode('utf-8', 'replace'),
+            "elapsed": round(elapsed, 4),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class RecordingAdapter(HTTPAdapter):
+    def __init__(self, recorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        try:
+            self.recorder.write(request, response, time.perf_counter() - started)
+        except Exception as e:
+            print(f"[x] 녹화 중 오류 발생: {e}")
+        return response
+
+
+def install_recorder(path, sessions):
+    # 세션들이 보내는 모든 요청/응답을 path(JSON lines)에 기록
+    recorder = Recorder(path)
+    for session in sessions:
+        adapter = RecordingAdapter(recorder)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    print(f"[+] 요청 녹화 시작: {path}")
+    return recorder
+
+
+class Recording:
+    def __init__(self, path):
+        # (kind, method, path, body) -> 응답 목록. 같은 요청이 반복되면 녹화 순서대로 재생
+        self.exact = {}
+        self.by_path = {}
+        self.cursors = {}
+        self.lock = threading.Lock()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                path_only = entry['path'].split('?')[0]
+                self.exact.setdefault((entry['kind'], entry['method'], entry['path'], entry['request']), []).append(entry)
+                self.by_path.setdefault((entry['kind'], entry['method'], path_only), []).append(entry)
+
+    def next(self, key, entries):
+        with self.lock:
+            index = self.cursors.get(key, 0)
+            self.cursors[key] = index + 1
+        return entries[min(index, len(entries) - 1)]
+
+    def lookup(self, kind, method, path, body):
+        key = (kind, method, path, canonical_body(body))
+        if key in self.exact:
+            return self.next(key, self.exact[key])
+        key = (kind, method, path.split('?')[0])
+        if key in self.by_path:
+            return self.next(key, self.by_path[key])
+        return None
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, kind, recording, latency=0.0, host='127.0.0.1', port=0):
+        super().__init__((host, port), StandInHandler)
+        self.kind = kind
+        self.recording = recording
+        self.latency = latency
+        self.requests = 0
+        self.embeds = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, name=f"stand-in-{self.kind}", daemon=True)
+        thread.start()
+        return self
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def handle_request(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if server.latency:
+            time.sleep(server.latency)
+
+        path = '/webhook' if server.kind == 'webhook' else self.path
+        entry = server.recording.lookup(server.kind, self.command, path, body) if server.recording else None
+        if entry is not None:
+            status = entry['status']
+            headers = entry['headers']
+            payload = entry['body']
+        else:
+            status, content_type, payload = DEFAULT_RESPONSES[server.kind]
+            headers = {'Content-Type': content_type}
+
+        with server.lock:
+            server.requests += 1
+            if server.kind == 'webhook' and body:
+                try:
+                    server.embeds += len(json.loads(body).get('embeds', []))
+                except ValueError:
+                    pass
+
+        data = payload.encode('utf-8')
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data and status != 204:
+            self.wfile.write(data)
+
+    do_GET = handle_request
+    do_POST = handle_request
+
+
+def start_servers(recording, latencies):
+    return {kind: StandInServer(kind, recording, latencies[kind]).start() for kind in KINDS}
+
+
+def replay_config(base_config, servers):
+    config = dict(base_config)
+    config["api_base"] = servers['api'].base_url
+    config["site_base"] = servers['site'].base_url
+    config["webhook_url"] = f"{servers['webhook'].base_url}/webhook/1"
+    config["webhook_url2"] = f"{servers['webhook'].base_url}/webhook/2"
+    config.setdefault("token", "replay")
+    config.setdefault("headers", {})
+    return config
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+    return values[index]
+
+
+def serve(args):
+    recording = Recording(args.log)
+    servers = start_servers(recording, latencies_from(args))
+    for kind, server in servers.items():
+        print(f"[+] {kind} stand-in: {server.base_url}")
+    print(json.dumps(replay_config({}, servers), indent=2, ensure_ascii=False))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+
+
+def bench(args):
+    recording = Recording(args.log) if args.log else None
+    servers = start_servers(recording, latencies_from(args))
+
+    workdir = tempfile.mkdtemp(prefix="lostark-replay-")
+    try:
+        base_config = {}
+        if args.config:
+            with open(args.config, 'rb') as f:
+                base_config = json.loads(f.read())
+        config = replay_config(base_config, servers)
+        config["conditions_path"] = os.path.abspath(args.conditions)
+        config["db_path"] = os.path.join(workdir, "items.db")
+        config_path = os.path.join(workdir, "config.json")
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False)
+
+        # run.py는 import 시점에 설정을 읽으므로 환경 변수로 설정 경로를 먼저 지정
+        os.environ["LOSTARK_NOTI_CONFIG"] = config_path
+        sys.path.insert(0, current_dir)
+        import run
+
+        runtime = run.Runtime()
+        run.notifier.start()
+        latencies = []
+        started = time.perf_counter()
+        try:
+            for cycle in range(args.cycles):
+                cycle_started = time.perf_counter()
+                runtime.run_cycle(list(runtime.conditions))
+                latencies.append(time.perf_counter() - cycle_started)
+        finally:
+            run.notifier.close()
+            runtime.close()
+        elapsed = time.perf_counter() - started
+    except Exception:
+        print(traceback.format_exc())
+        sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(f"[+] 사이클 {len(latencies)}회, 총 {elapsed:.2f}초")
+    print(f"[+] 사이클 지연: 평균 {sum(latencies) / len(latencies):.3f}초, p50 {percentile(latencies, 0.5):.3f}초, "
+          f"p95 {percentile(latencies, 0.95):.3f}초, 최대 {max(latencies):.3f}초")
+    for kind, server in servers.items():
+        print(f"[+] {kind} 요청 {server.requests}회 (사이클당 {server.requests / len(latencies):.1f}회)")
+    print(f"[+] 알림 {servers['webhook'].embeds}건, {servers['webhook'].embeds / elapsed:.2f} notifications/sec")
+
+
+def latencies_from(args):
+    return {
+        'api': args.api_latency if args.api_latency is not None else args.latency,
+        'site': args.site_latency if args.site_latency is not None else args.latency,
+        'webhook': args.webhook_latency if args.webhook_latency is not None else args.latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화된 요청을 로컬 서버로 재생")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_latency_args(p):
+        p.add_argument("--latency", type=float, default=0.05, help="기본 응답 지연(초)")
+        p.add_argument("--api-latency", type=float)
+        p.add_argument("--site-latency", type=float)
+        p.add_argument("--webhook-latency", type=float)
+
+    p_serve = sub.add_parser("serve", help="녹화 로그를 재생하는 로컬 서버 실행")
+    p_serve.add_argument("log")
+    add_latency_args(p_serve)
+
+    p_bench = sub.add_parser("bench", help="재생 서버를 상대로 run.py 사이클을 돌려 성능 측정")
+    p_bench.add_argument("--log", help="run.py --record 로 만든 녹화 로그")
+    p_bench.add_argument("--conditions", default=os.path.join(current_dir, "conditions.json"))
+    p_bench.add_argument("--config", help="기본 설정 (token, headers, concurrency 등). URL은 재생 서버로 덮어씀")
+    p_bench.add_argument("--cycles", type=int, default=3)
+    add_latency_args(p_bench)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        bench(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,36 @@
 import requests
 import json
+import argparse
 import traceback
-import sqlite3
-import hashlib
+import time
 import os
-import re
+import signal
+import subprocess
+import sys
 import urllib.parse
 import warnings
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from collections import Counter
-from bs4 import BeautifulSoup
+from crawler import Crawler
+from probe import ChangeProbe, UNCHANGED, DEFAULT_MAX_SKIPS
+from pagination import PagePlan, DEFAULT_MAX_PAGES
+from planner import OptionCatalog, plan_queries
+from conditions import compile_conditions
+from history import PriceHistory, PriceModel
+from ratelimit import KeyPool, DEFAULT_PER_MINUTE
+from scheduler import Scheduler
+from market import MarketState
+from storage import Storage
+from search_cache import ProductResolver
+from parsers import get_parser
+import matching
+from listing import from_api
+from replay import install_recorder
+from notifier import Notifier, PRIORITY_LOWEST, PRIORITY_NORMAL
+from metrics import METRICS
+from profiling import CycleProfiler
+from leases import LeaseStore, LeaseKeeper, DEFAULT_LEASE_TTL
+from offload import Offload, from_row
 
 # InsecureRequestWarning 경고 무시
 warnings.filterwarnings("ignore", message="Unverified HTTPS request")
@@ -51,203 +72,49 @@ def normalize_path(path):
     # os.path.normpath를 사용하여 현재 OS에 맞는 형식으로 변환
     return os.path.normpath(normalized)
 
-with open(normalize_path(f"{current_dir}/config.json"), "rb") as f:
+# 설정 파일 경로는 환경 변수로 바꿀 수 있음 (replay.py 벤치마크 등)
+config_path = os.environ.get("LOSTARK_NOTI_CONFIG") or normalize_path(f"{current_dir}/config.json")
+with open(config_path, "rb") as f:
     config = json.loads(f.read())
 
-token = config["token"]
+# 여러 개의 API 키를 등록하면 요청을 키별 쿼터에 맞춰 분산
+tokens = config.get("tokens") or [config["token"]]
+# 코디네이터(--workers N)가 띄운 워커 프로세스는 "워커 번호/워커 수"를 환경 변수로 받음
+worker_slot = os.environ.get("LOSTARK_NOTI_WORKER")
 webhook_url = config["webhook_url"]
 webhook_url2 = config["webhook_url2"]  # 최저가 알림을 위한 웹훅 URL
 secondpass = config.get("secondpass", "")  # Optional field
+# 최저가 대비 알림 구간 (threshold 페이지 모드의 조기 중단 기준으로도 사용)
+alert_band = config.get("alert_band", 1.15)
+api_base = config.get("api_base", "https://developer-lostark.game.onstove.com")
+site_base = config.get("site_base", "https://lostark.game.onstove.com")
 
 # KST 시간대 정의
 KST = timezone(timedelta(hours=9))
 
-def clean_html(raw_html):
-    cleanr = re.compile('<.*?>')
-    cleantext = re.sub(cleanr, '', raw_html)
-    return cleantext.strip()
-
-def parse_time(time_str):
-    if '시간' in time_str and '분' in time_str:
-        hours, minutes = re.search(r'(\d+)시간\s*(\d+)분', time_str).groups()
-        return timedelta(hours=int(hours), minutes=int(minutes))
-    elif '시간' in time_str:
-        hours = re.search(r'(\d+)시간', time_str).group(1)
-        return timedelta(hours=int(hours))
-    elif '분' in time_str:
-        minutes = re.search(r'(\d+)분', time_str).group(1)
-        return timedelta(minutes=int(minutes))
-    return timedelta()
-
-def parse_trade_count(text):
-    if '불가' in text:
-        return 0
-    match = re.search(r'(\d+)회', text)
-    if match:
-        return int(match.group(1))
-    return 0  # 기본값으로 0 반환
-
-def parse_auction_items(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    items = []
-    for row in soup.select('table.auctionListTable tbody tr'):
-        item = {}
-        
-        # 아이템 이름
-        item['Name'] = row.select_one('span.name').text.strip()
-        
-        # 등급, 티어, 레벨, 아이콘
-        button = row.select_one('button.button--deal-history')
-        item['Grade'] = button['data-grade']
-        item['Tier'] = int(button['data-tier'])
-        item['Level'] = int(button['data-itemlevel'])
-        item['Icon'] = button['data-itempath']
-        
-        # 품질
-        quality = row.select_one('div.quality span.txt')
-        if quality:
-            item['GradeQuality'] = int(quality.text)
-        
-        # 경매 정보
-        item['AuctionInfo'] = {}
-        price_row = row.select_one('div.price-row')
-        buy_price = row.select_one('div.price-buy em')
-        
-        if price_row:
-            start_price = int(price_row.select_one('em').text.replace(',', ''))
-            current_bid = int(price_row.select_one('span.tooltip em').text.replace(',', ''))
-            item['AuctionInfo']['StartPrice'] = start_price
-            item['AuctionInfo']['BidPrice'] = current_bid
-            item['AuctionInfo']['BidStartPrice'] = start_price
-        
-        if buy_price:
-            item['AuctionInfo']['BuyPrice'] = int(buy_price.text.replace(',', ''))
-        
-        # 남은 시간
-        time_left = row.select_one('div.time')
-        if time_left:
-            item['AuctionInfo']['EndDate'] = (datetime.now() + parse_time(time_left.text.strip())).isoformat()
-        
-        # 거래 가능 횟수
-        trade_count_elem = row.select_one('span.count')
-        if trade_count_elem:
-            trade_count_text = trade_count_elem.text.strip()
-            item['AuctionInfo']['TradeAllowCount'] = parse_trade_count(trade_count_text)
-        else:
-            item['AuctionInfo']['TradeAllowCount'] = 0  # 정보가 없는 경우 기본값 0
-        
-        # 아이템 옵션
-        option_json = button['data-optionjson']
-        options = json.loads(option_json)
-        item['Options'] = []
-        for option in options:
-            option_name = clean_html(option['secondOptionText'])
-            option_value = option['optionValue']
-            option_type = 'ARK_PASSIVE' if option['optionType'] == 8 else 'ACCESSORY_UPGRADE'
-            item['Options'].append({
-                'Type': option_type,
-                'OptionName': option_name,
-                'OptionNameTripod': '',
-                'Value': float(option_value),
-                'IsPenalty': False,
-                'ClassName': None,
-                'IsValuePercentage': option_type == 'ACCESSORY_UPGRADE'
-            })
-        
-        # 아이템 고유 번호
-        product_id = row.select_one('button.button--deal-buy')['data-productid']
-        item['ProductId'] = product_id
-        
-        items.append(item)
+# 매칭 실패 시 상세 비교 결과 출력 여부
+matching.DEBUG = config.get("debug_matching", False)
 
-    return items
+# 사이트 검색 결과 파서 (bs4 / lxml / stream, 기본은 사용 가능한 가장 빠른 파서)
+parse_auction_items = get_parser(config.get("parser", "auto"))
+
+# 사이트 검색용 세션 (데몬 모드에서 커넥션 재사용)
+site_session = requests.session()
+site_session.verify = False
+site_session.headers = config["headers"]
 
 def search_item(infos):
-    u = "https://lostark.game.onstove.com/Auction"
-    r = requests.post(u,data=infos,headers=config["headers"],verify=False)
-    return r.content.decode()
-
-def items_match(item1, item2, time_tolerance=timedelta(minutes=3)):
-    # Compare basic attributes
-    if item1['itemName'] != item2['Name']:
-        print(f"Item name mismatch: {item1['itemName']} != {item2['Name']}")
-        return False
-    if item1.get('gradeQuality') != item2.get('GradeQuality'):
-        print(f"Grade quality mismatch: {item1.get('gradeQuality')} != {item2.get('GradeQuality')}")
-        return False
-    if item1.get('buyPrice') != item2["AuctionInfo"]['BuyPrice']:
-        print(f"Buy price mismatch: {item1.get('buyPrice')} != {item2['AuctionInfo']['BuyPrice']}")
-        return False
-    if item1.get('tradeAllowCount') != item2["AuctionInfo"]['TradeAllowCount']:
-        print(f"Trade allow count mismatch: {item1.get('tradeAllowCount')} != {item2['AuctionInfo']['TradeAllowCount']}")
-        return False
-        
-    # Compare auction prices
-    if item1.get('startPrice') != item2["AuctionInfo"]['StartPrice']:
-        print(f"Start price mismatch: {item1.get('startPrice')} != {item2['AuctionInfo']['StartPrice']}")
-        return False
-    if item1.get('bidPrice') != item2["AuctionInfo"]['BidPrice']:
-        print(f"Bid price mismatch: {item1.get('bidPrice')} != {item2['AuctionInfo']['BidPrice']}")
-        return False
-    
-    # Compare end dates with tolerance
-    endDate1 = parse_endDate(item1['endDate'])
-    endDate2 = parse_endDate(item2["AuctionInfo"]['EndDate'])
-    if endDate1 and endDate2:
-        if abs(endDate1 - endDate2) > time_tolerance:
-            print(f"End date mismatch beyond tolerance: {endDate1} != {endDate2}")
-            return False
-    else:
-        print("Cannot compare items without valid end dates")
-        return False  # Cannot compare items without valid end dates
-    
-    # Compare options
-    options1 = Counter(x.replace("%","").strip() for x in item1['optionInfo'].split('\n') if x.strip())
-    options2 = Counter(f"{opt['OptionName']} - {opt['Value']}".strip() for opt in item2['Options'])
-    
-    if options1 != options2:
-        print("Options mismatch:")
-        print("Item1 options:", dict(options1))
-        print("Item2 options:", dict(options2))
-        
-        # 세부적인 차이점 출력
-        diff1 = options1 - options2
-        diff2 = options2 - options1
-        if diff1:
-            print("Options in Item1 but not in Item2:", dict(diff1))
-        if diff2:
-            print("Options in Item2 but not in Item1:", dict(diff2))
-        
-        return False
-
-    # All checks passed
-    return True
-
-def parse_endDate(endDate_str):
-    try:
-        dt = datetime.strptime(endDate_str, '%Y-%m-%dT%H:%M:%S.%f')
-    except ValueError:
-        try:
-            dt = datetime.strptime(endDate_str, '%Y-%m-%dT%H:%M:%S')
-        except ValueError:
-            print(f"[parse_endDate] 종료 시간 파싱 실패: {endDate_str}")
-            return None
-    # 서버에서 받은 시간에 KST 시간대를 설정
-    dt = dt.replace().astimezone(KST)
-    return dt
-
-def generate_item_id(item):
-    # 아이템의 고유 ID 생성 (아이템 이름, 옵션, 가격, 종료 시간 등을 조합)
-    unique_string = f"{item['itemName']}_{item['optionInfo']}_{item['price']}_{item['endDate']}"
-    return hashlib.md5(unique_string.encode('utf-8')).hexdigest()
-def send_discord_message(condition_name, item_details, lowest_price, is_lowest_price=False):
+    u = f"{site_base}/Auction"
+    METRICS.inc("requests_total", target="site")
+    with METRICS.span("search_item"):
+        r = site_session.post(u,data=infos)
+        return r.content.decode()
+
+def send_discord_message(condition_name, item_details, lowest_price, is_lowest_price=False, claim=None):
     global webhook_url, webhook_url2
     # 남은 시간 계산
-    endDate_datetime = parse_endDate(item_details['endDate'])
-    current_time = datetime.now(KST)
-    if endDate_datetime:
-        time_diff = endDate_datetime - current_time
-        total_seconds = int(time_diff.total_seconds())
+    if item_details.end_ms is not None:
+        total_seconds = (item_details.end_ms - int(time.time() * 1000)) // 1000
         if total_seconds > 0:
             hours, remainder = divmod(total_seconds, 3600)
             minutes, seconds = divmod(remainder, 60)
@@ -257,7 +124,7 @@ def send_discord_message(condition_name, item_details, lowest_price, is_lowest_p
     else:
         time_remaining = "종료 시간 파싱 불가"
 
-    current_price = item_details['price']
+    current_price = item_details.price
 
     # 가격 차이 계산
     price_difference = current_price - lowest_price
@@ -265,7 +132,7 @@ def send_discord_message(condition_name, item_details, lowest_price, is_lowest_p
     price_difference_display = f"{price_difference} ({price_difference_percentage:.2f}%)"
 
     # 거래 가능 횟수 확인
-    trade_allow_count = item_details.get('tradeAllowCount', 0)
+    trade_allow_count = item_details.trade_count
 
     # 메시지 제목 및 색상 설정
     if trade_allow_count != 2 and is_lowest_price:
@@ -290,10 +157,10 @@ def send_discord_message(condition_name, item_details, lowest_price, is_lowest_p
         webhook_to_use = webhook_url  # 일반 알림 웹훅 사용
 
     # 옵션 정보 구성
-    option_info = item_details['optionInfo']
+    option_info = item_details.option_info
 
     # 구매 링크 생성
-    product_id = item_details.get('ProductId', 'N/A')
+    product_id = item_details.product_id or 'N/A'
     buy_link = f"http://43.201.250.186:50000/buy?itemno={product_id}&price={current_price}"
 
     # Discord 임베드 메시지 구성
@@ -304,7 +171,7 @@ def send_discord_message(condition_name, item_details, lowest_price, is_lowest_p
         "fields": [
             {
                 "name": "아이템 이름",
-                "value": item_details['itemName'],
+                "value": item_details.name,
                 "inline": False
             },
             {
@@ -319,7 +186,7 @@ def send_discord_message(condition_name, item_details, lowest_price, is_lowest_p
             },
             {
                 "name": "품질",
-                "value": str(item_details['gradeQuality']),
+                "value": str(item_details.grade_quality),
                 "inline": True
             },
             {
@@ -334,380 +201,480 @@ def send_discord_message(condition_name, item_details, lowest_price, is_lowest_p
             }
         ],
         "thumbnail": {
-            "url": item_details['icon']
+            "url": item_details.icon
         },
         "timestamp": datetime.now(KST).isoformat()
     }
-    data = {
-        "embeds": [embed]
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    try:
-        response = requests.post(webhook_to_use, data=json.dumps(data), headers=headers, verify=False)
-        if response.status_code == 204 or response.status_code == 200:
-            print(f"[{current_time}] {condition_name} - 메시지가 성공적으로 전송되었습니다.")
-        else:
-            print(f"메시지 전송 실패. 상태 코드: {response.status_code} - {response.text}")
-    except Exception as e:
-        print(f"[send_discord_message] 메시지 전송 중 오류 발생: {e}")
-        traceback.print_exc()
+    # 최저가 알림은 일반 알림보다 먼저 전송되도록 우선순위 지정
+    priority = PRIORITY_LOWEST if is_lowest_price else PRIORITY_NORMAL
+    METRICS.inc("alerts_total", kind="lowest" if is_lowest_price else "normal")
+    notifier.enqueue(webhook_to_use, embed, condition_name, priority, claim=claim)
 
 
+# 디스코드 알림은 백그라운드 스레드에서 묶어서 전송
+notifier = Notifier()
+
 def log(message):
     print(message)
     # 필요 시 로그를 파일에 저장하거나 추가적인 처리 가능
 
-# 테이블에 컬럼이 있는지 확인하고 없으면 추가
-def add_column_if_not_exists(cursor, table_name, column_name, column_type):
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [column[1] for column in cursor.fetchall()]
-    if column_name not in columns:
-        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
-        print(f"[+] '{column_name}' 컬럼이 '{table_name}' 테이블에 추가되었습니다.")
-
-s = requests.session()
-s.verify = False
-s.headers = {
-    "Content-Type": "application/json",
-    "Authorization": f"bearer {token}"
-}
-
-with open(normalize_path(f"{current_dir}/conditions.json"), "rb") as f:
-    try:
-        conditions = json.loads(f.read())
-    except Exception as e:
-        print(f"[x] condition load error: {e}")
-        log(traceback.format_exc())
-        exit(1)
+def worker_keys(tokens, slot):
+    # 키가 워커 수 이상이면 워커별로 나눠 갖고, 모자라면 모든 워커가 같은 키를 쓰되 쿼터를 워커 수만큼 나눔
+    if not slot:
+        return tokens, 1
+    index, count = (int(value) for value in slot.split("/"))
+    if len(tokens) >= count:
+        return tokens[index::count], 1
+    return tokens, count
 
-print(f"[+] {datetime.now(KST)} - 조건 로드 성공")
-
-# 데이터베이스 설정
-try:
-    conn = sqlite3.connect(normalize_path(f'{current_dir}/items.db'))  # 절대 경로로 변경
-    cursor = conn.cursor()
-except Exception as e:
-    print(f"[x] 데이터베이스 연결 실패: {e}")
-    log(traceback.format_exc())
-    exit(1)
-
-# 테이블 생성 및 'infos' 컬럼 추가 확인
-try:
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS items (
-        condition_name TEXT,
-        itemName TEXT,
-        optionInfo TEXT,
-        endDate TEXT,
-        price REAL,
-        tradeAllowCount INTEGER,
-        gradeQuality INTEGER,
-        icon TEXT
-    )
-    ''')
-
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS lowest_prices (
-        condition_name TEXT PRIMARY KEY,
-        lowest_price REAL
-    )
-    ''')
-
-    # 이미 알림을 보낸 아이템을 추적하기 위한 테이블 생성
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS notified_items (
-        item_id TEXT PRIMARY KEY
-    )
-    ''')
-
-    # 테이블 수정
-    add_column_if_not_exists(cursor, 'items', 'infos', 'TEXT')
-    add_column_if_not_exists(cursor, 'items', 'startPrice', 'REAL')
-    add_column_if_not_exists(cursor, 'items', 'bidPrice', 'REAL')
-    add_column_if_not_exists(cursor, 'items', 'buyPrice', 'REAL')
-
-    conn.commit()
-    print("[+] 데이터베이스 테이블 확인 완료")
-except Exception as e:
-    print(f"[x] 테이블 생성 중 오류 발생: {e}")
-    log(traceback.format_exc())
-    conn.close()
-    exit(1)
-# items 테이블 초기화
-try:
-    cursor.execute('DELETE FROM items')
-    conn.commit()
-    print("[+] items 테이블 초기화 완료")
-except Exception as e:
-    print(f"[x] items 테이블 초기화 중 오류 발생: {e}")
-    log(traceback.format_exc())
-    conn.close()
-    exit(1)
-
-for condition in conditions:
-    cnt = 0
-    conditions[condition]["PageNo"] = 1  # 페이지 번호 초기화
-    while True:
+worker_tokens, key_share = worker_keys(tokens, worker_slot)
+s = KeyPool(worker_tokens, per_minute=config.get("rate_limit_per_minute", DEFAULT_PER_MINUTE), share=key_share)
+
+def load_conditions():
+    with open(normalize_path(config.get("conditions_path", f"{current_dir}/conditions.json")), "rb") as f:
         try:
-            response = s.post("https://developer-lostark.game.onstove.com/auctions/items", json=conditions[condition])
-            response.raise_for_status()
-            r = response.json()
-            totalCount = r.get("TotalCount", 0)
-            pageSize = r.get("PageSize", 0)
-            print(f"[{datetime.now(KST)}] '{condition}' 조건에 대한 데이터 수집 시작({cnt}/{totalCount})")
-            cnt += pageSize
-
-            items_list = r.get("Items", [])
-            if not items_list:
-                print(f"[{condition}] 아이템이 없습니다.")
-                break
-
-            for item in items_list:
-                auctionInfo = item.get("AuctionInfo", {})
-                options = item.get("Options", [])
-
-                optionInfos = []
-                for option in options:
-                    optionName = option.get("OptionName", "Unknown Option").strip()
-                    value = option.get("Value", 0)
-                    if option.get("IsValuePercentage", False):
-                        value_str = f"{value}%"
-                    else:
-                        value_str = str(value)
-                    optionInfos.append(f'{optionName} - {value_str}')
-
-                optionInfo = '\n'.join(optionInfos)
-                price = auctionInfo.get("BuyPrice")
-                tradeAllowCount = auctionInfo.get("TradeAllowCount")
-                gradeQuality = item.get("GradeQuality")
-                itemName = item.get("Name")
-                icon = item.get("Icon")
-                endDate = auctionInfo.get("EndDate")
-
-                buy_options = []
-                for option in conditions[condition]["EtcOptions"]:
-                    t = {}
-                    t["firstOption"] = option["FirstOption"]
-                    t["secondOption"] = option["SecondOption"]
-                    t["minValue"] = option["MinValue"]
-                    t["maxValue"] = option["MaxValue"]
-                    buy_options.append(t)
-
-                skill_options = []
-                for option in conditions[condition]["SkillOptions"]:
-                    t = {}
-                    t["firstOption"] = option["FirstOption"]
-                    t["secondOption"] = option["SecondOption"]
-                    t["minValue"] = option["MinValue"]
-                    t["maxValue"] = option["MaxValue"]
-                    skill_options.append(t)
-
-                # infos dictionary를 json dump해서 db에 삽입
-                infos = {
-                    "firstCategory": conditions[condition]["FirstCategory"],
-                    "secondCategory": conditions[condition]["CategoryCode"],
-                    "classNo": "",
-                    "itemTier": conditions[condition]["ItemTier"],
-                    "itemGrade": conditions[condition]["ItemGrade2"],
-                    "itemLevelMin": 0,
-                    "itemLevelMax": 1800,
-                    "itemName": itemName,
-                    "pageNo": conditions[condition]["PageNo"],
-                    "sortOption": {
-                        "Sort": "BUY_PRICE",
-                        "IsDesc": False
-                    },
-                    "gradeQuality": gradeQuality,
-                    "skillOptionList": skill_options,
-                    "etcOptionList": buy_options
-                }
-                infos_json = json.dumps(infos)
-
-                # price 또는 endDate가 None이면 건너뜀
-                if price is None or endDate is None:
-                    continue
-
-                # 데이터베이스에 삽입
-                try:
-                    cursor.execute('''
-                    INSERT INTO items (condition_name, itemName, optionInfo, endDate, price, tradeAllowCount, gradeQuality, icon, infos, startPrice, bidPrice, buyPrice)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (condition, itemName, optionInfo, endDate, price, tradeAllowCount, gradeQuality, icon, infos_json, auctionInfo.get('StartPrice'), auctionInfo.get('BidPrice'), auctionInfo.get('BuyPrice')))
-                    conn.commit()
-                except Exception as e:
-                    print(f"[x] 데이터베이스 삽입 중 오류 발생: {e}")
-                    log(traceback.format_exc())
-
-            if cnt < totalCount and cnt <= 30:
-                conditions[condition]["PageNo"] += 1
-                continue
-            else:
-                break
+            # 요청 바디, 사이트 검색 폼, 로컬 설정(폴링 주기/페이지 설정)은 로드 시 한 번만 만들어 둠
+            conditions = compile_conditions(json.loads(f.read()))
         except Exception as e:
-            print(f"[x] 검색 오류 발생 - '{condition}': {e}")
+            print(f"[x] condition load error: {e}")
             log(traceback.format_exc())
-            break  # 에러 발생 시 루프 종료
+            exit(1)
 
-print("[+] 데이터 수집 완료")
+    print(f"[+] {datetime.now(KST)} - 조건 로드 성공")
+    return conditions
 
-# 크롤링 후 각 조건에 대해 처리
-for condition in conditions:
-    print(f"[{datetime.now(KST)}] '{condition}' 조건에 대한 아이템 처리 시작")
-    # 현재 KST 시간
-    current_time = datetime.now(KST)
-    # 해당 조건의 아이템 가져오기
+def build_page_plan(setting, band=alert_band):
+    return PagePlan(mode=setting.get("PageMode", config.get("page_mode", "full")),
+                    max_pages=setting.get("MaxPages", config.get("max_pages", DEFAULT_MAX_PAGES)),
+                    band=band)
+
+def init_db(shared=False):
+    # 데이터베이스 설정
     try:
-        cursor.execute('''
-        SELECT price, endDate, itemName, optionInfo, tradeAllowCount, gradeQuality, icon, infos, startPrice, bidPrice, buyPrice
-        FROM items WHERE condition_name = ?
-        ''', (condition,))
+        storage = Storage(normalize_path(config.get("db_path", f'{current_dir}/items.db')), shared=shared)  # 절대 경로로 변경
+    except Exception as e:
+        print(f"[x] 데이터베이스 연결 실패: {e}")
+        log(traceback.format_exc())
+        exit(1)
 
-        rows = cursor.fetchall()
+    # 테이블 생성 및 컬럼/인덱스 확인
+    try:
+        storage.init_schema()
+        print("[+] 데이터베이스 테이블 확인 완료")
     except Exception as e:
-        print(f"[x] 데이터베이스 조회 중 오류 발생: {e}")
+        print(f"[x] 테이블 생성 중 오류 발생: {e}")
         log(traceback.format_exc())
-        continue
+        storage.close()
+        exit(1)
+    return storage
 
-    items = []
-    for row in rows:
-        price, endDate, itemName, optionInfo, tradeAllowCount, gradeQuality, icon, infos_json, startPrice, bidPrice, buyPrice = row
-        # price가 None이면 건너뜀
-        if price is None:
-            continue
-        endDate_datetime = parse_endDate(endDate)
-        if endDate_datetime and endDate_datetime > current_time:
-            items.append({
-                'price': price,
-                'endDate': endDate,
-                'itemName': itemName,
-                'optionInfo': optionInfo,
-                'tradeAllowCount': tradeAllowCount,
-                'gradeQuality': gradeQuality,
-                'icon': icon,
-                'infos': infos_json,
-                'startPrice': startPrice,
-                'bidPrice': bidPrice,
-                'buyPrice': buyPrice
-            })
-        else:
-            # 경매가 종료된 경우 건너뜀
-            continue
-
-    if items:
-        # 가격이 숫자인 아이템만 필터링
-        prices = [item['price'] for item in items if isinstance(item['price'], (int, float))]
-
-        if prices:
-            current_lowest_price = min(prices)
-            # 가격 차이가 20% 이하인 아이템만 필터링
-            threshold_price = current_lowest_price * 1.15
-            filtered_items = [item for item in items if item['price'] <= threshold_price]
-
-            # 최저가 아이템 가져오기
-            lowest_price_item = next(item for item in filtered_items if item['price'] == current_lowest_price)
-            # 이전 최저가 가져오기
-            cursor.execute('SELECT lowest_price FROM lowest_prices WHERE condition_name = ?', (condition,))
-            result = cursor.fetchone()
-            if result:
-                previous_lowest_price = result[0]
-            else:
-                previous_lowest_price = None
-
-            # 가격 비교
-            if previous_lowest_price is None or current_lowest_price < previous_lowest_price:
-                # 최저가일 경우 디비에 넣어놨던 json dumps (infos) 꺼내와서 search_item의 인자로 넘기기
-                infos_json = lowest_price_item.get('infos')
-                if infos_json:
-                    infos = json.loads(infos_json)
-                    
-                    # search_item의 인자로 infos를 넘겨서 검색 수행
-                    search_result = search_item(generate_query_params(infos))
-                    result_items = parse_auction_items(search_result)
-
-                    # 최저가 아이템에 해당하는 정보를 찾기
-                    matched_product_id = None
-                    
-                    for item in result_items:
-                        if items_match(lowest_price_item, item):
-                            matched_product_id = item['ProductId']
-                            print(f"[+] Matched Product ID: {matched_product_id}")
-                            # 최저가 아이템에 ProductId 추가
-                            lowest_price_item['ProductId'] = matched_product_id
-                            break
-                    if matched_product_id:
-                        # 최저가 아이템에 대한 알림 전송 (webhook_url2 사용)
-                        send_discord_message(condition, lowest_price_item, current_lowest_price, is_lowest_price=True)
-                    else:
-                        print("[!] Matching item not found in result_items.")
-                        lowest_price_item['ProductId'] = "can't_find"
-                        send_discord_message(condition, lowest_price_item, current_lowest_price, is_lowest_price=True)
-                else:
-                    print("[x] 'infos' 데이터가 없습니다.")
-
-                # 최저가 업데이트
-                try:
-                    cursor.execute('''
-                    INSERT OR REPLACE INTO lowest_prices (condition_name, lowest_price)
-                    VALUES (?, ?)
-                    ''', (condition, current_lowest_price))
-                    conn.commit()
-                except Exception as e:
-                    print(f"[x] 최저가 업데이트 중 오류 발생: {e}")
-                    log(traceback.format_exc())
+def resolve_product(resolver, item, compiled):
+    # 사이트 검색 실패(연결 오류 등)는 매칭 실패와 같이 처리해서 알림은 그대로 보냄
+    try:
+        return resolver.resolve(item, compiled)
+    except Exception as e:
+        print(f"[x] 사이트 검색 중 오류 발생: {e}")
+        log(traceback.format_exc())
+        return None
+
+def process_condition(storage, resolver, compiled, index, candidates, price_model):
+    condition = compiled.name
+    print(f"[{datetime.now(KST)}] '{condition}' 조건에 대한 아이템 처리 시작")
+    # 현재 시간 (epoch 밀리초, 종료 시간과 바로 비교)
+    now_ms = int(time.time() * 1000)
+
+    # 가격 색인에서 종료된 매물을 정리하고 최저가 아이템을 바로 조회 (가격/종료 시간이 없는 매물은 색인에 없음)
+    lowest_price_item = index.lowest(now_ms)
+
+    if lowest_price_item is not None:
+        current_lowest_price = lowest_price_item.price
+        # 알림 구간 이내인 아이템만 가격 오름차순으로 조회 (기본은 최저가 대비 15%, price_model 설정 시 최저가 이력 기반)
+        threshold_price = price_model.threshold(condition, current_lowest_price)
+        filtered_items = index.within(threshold_price, now_ms)
+
+        # 이전 최저가 가져오기
+        previous_lowest_price = storage.get_lowest_price(condition)
+
+        # 가격 비교
+        if previous_lowest_price is None or current_lowest_price < previous_lowest_price:
+            # 최저가일 경우 조건의 사이트 검색 폼으로 검색해서 ProductId 확인
+            matched_product_id = resolve_product(resolver, lowest_price_item, compiled)
+            if matched_product_id:
+                print(f"[+] Matched Product ID: {matched_product_id}")
+                # 최저가 아이템에 ProductId 추가
+                lowest_price_item.product_id = matched_product_id
+                # 최저가 아이템에 대한 알림 전송 (webhook_url2 사용)
+                send_discord_message(condition, lowest_price_item, current_lowest_price, is_lowest_price=True)
             else:
-                pass  # 최저가 변동 없음
-
-            # 여기부터 신규 등록된 아이템에 대한 알림 전송
-            # 모든 아이템에 대해 알림 전송 (이미 알림을 보낸 아이템은 제외)
-            for item in filtered_items:
-                item_id = generate_item_id(item)
-                cursor.execute('SELECT item_id FROM notified_items WHERE item_id = ?', (item_id,))
-                if cursor.fetchone():
-                    # 이미 알림을 보낸 아이템
-                    continue
-                infos_json = item.get('infos')
-                if infos_json:
-                    infos = json.loads(infos_json)
-                    
-                    # search_item의 인자로 infos를 넘겨서 검색 수행
-                    search_result = search_item(generate_query_params(infos))
-                    result_items = parse_auction_items(search_result)
-
-                    # 최저가 아이템에 해당하는 정보를 찾기
-                    matched_product_id = None
-                    
-                    for item1 in result_items:
-                        if items_match(item, item1):
-                            matched_product_id = item1['ProductId']
-                            print(f"[+] Matched Product ID: {matched_product_id}")
-                            # 최저가 아이템에 ProductId 추가
-                            item['ProductId'] = matched_product_id
-                            break
-
-                    is_lowest_price = (item == lowest_price_item) and (previous_lowest_price is None or current_lowest_price < previous_lowest_price)
-
-                    if matched_product_id:
-                        # 최저가 아이템에 대한 알림 전송 (webhook_url2 사용)
-                        send_discord_message(condition, item, current_lowest_price, is_lowest_price=is_lowest_price)
-                    else:
-                        print("[!] Matching item not found in result_items.")
-                        lowest_price_item['ProductId'] = "can't_find"
-                        send_discord_message(condition, item, current_lowest_price, is_lowest_price=is_lowest_price)
+                print("[!] Matching item not found in result_items.")
+                lowest_price_item.product_id = "can't_find"
+                send_discord_message(condition, lowest_price_item, current_lowest_price, is_lowest_price=True)
+
+            # 최저가 업데이트
+            try:
+                storage.set_lowest_price(condition, current_lowest_price)
+            except Exception as e:
+                print(f"[x] 최저가 업데이트 중 오류 발생: {e}")
+                log(traceback.format_exc())
+        else:
+            pass  # 최저가 변동 없음
+
+        # 여기부터 신규 등록된 아이템에 대한 알림 전송
+        # 이번 사이클에 새로 등록됐거나 가격이 바뀐 아이템만 알림 전송 (이미 알림을 보낸 아이템은 제외)
+        for item in filtered_items:
+            if item.key not in candidates:
+                continue
+            # 이미 알림을 보낸 아이템은 건너뛰고, 아니면 알림 기록을 먼저 남김 (워커 모드에서는 다른 워커와 중복 전송 방지)
+            if not storage.claim_notified(item.alert_id, item.end_ms):
+                continue
+            try:
+                # 같은 검색 조건의 페이지는 캐시에서 재사용
+                matched_product_id = resolve_product(resolver, item, compiled)
+                if matched_product_id:
+                    print(f"[+] Matched Product ID: {matched_product_id}")
+                    item.product_id = matched_product_id
+
+                is_lowest_price = (item == lowest_price_item) and (previous_lowest_price is None or current_lowest_price < previous_lowest_price)
+                # 알림 스레드가 재시도 끝에 보내지 못하면 다음 사이클에 기록을 되돌리고 다시 알림
+                claim = (condition, item.key, item.alert_id)
+
+                if matched_product_id:
+                    # 최저가 아이템에 대한 알림 전송 (webhook_url2 사용)
+                    send_discord_message(condition, item, current_lowest_price, is_lowest_price=is_lowest_price, claim=claim)
                 else:
-                    print("[x] 'infos' 데이터가 없습니다.")
-                
-                # 알림 보낸 아이템 기록
-                cursor.execute('INSERT INTO notified_items (item_id) VALUES (?)', (item_id,))
-                conn.commit()
+                    print("[!] Matching item not found in result_items.")
+                    lowest_price_item.product_id = "can't_find"
+                    send_discord_message(condition, item, current_lowest_price, is_lowest_price=is_lowest_price, claim=claim)
+            except Exception:
+                # 알림을 보내지 못했으면 선점한 기록을 되돌려서 다음 사이클에 다시 알림
+                storage.release_notified(item.alert_id)
+                raise
 
-        else:
-            print(f"[{datetime.now(KST)}] '{condition}' 유효한 가격 정보가 있는 아이템이 없습니다.")
+        # 알림 기록은 조건 단위로 한 번에 커밋
+        storage.flush()
 
     else:
         print(f"[{datetime.now(KST)}] '{condition}' 유효한 아이템을 찾을 수 없습니다.")
 
-# 데이터베이스 연결 종료
-conn.close()
-print(f"[{datetime.now(KST)}] 프로그램 실행 완료")
+def record_history(history, condition, index):
+    # 변경분이 없어도 현재 최저가는 이력에 남김 (같은 값이면 heartbeat 간격으로만 기록)
+    now_ms = int(time.time() * 1000)
+    lowest_item = index.lowest(now_ms)
+    if lowest_item is not None:
+        history.record(condition, lowest_item.price, index.count(now_ms), now_ms)
+
+def run_cycle(storage, crawler, market, resolver, conditions, plans, names, price_model, groups=None, offload=None):
+    # 사이클 전체 소요 시간은 히스토그램으로, 단계별 소요 시간은 각 단계의 span으로 기록
+    started = time.perf_counter()
+    try:
+        collect_and_notify(storage, crawler, market, resolver, conditions, plans, names, price_model, groups, offload)
+    finally:
+        elapsed = time.perf_counter() - started
+        METRICS.observe("cycle_seconds", elapsed)
+        METRICS.inc("cycles_total")
+        METRICS.event("cycle", conditions=len(names), duration_ms=round(elapsed * 1000, 3))
+        print_stage_summary()
+
+def print_stage_summary():
+    # 누적 단계별 소요 시간 (횟수, 평균)
+    summary = METRICS.summary()
+    if summary:
+        print("[+] 단계별 소요 시간 - " + ", ".join(f"{stage} {count}회 평균 {total / count * 1000:.1f}ms" for stage, (count, total) in sorted(summary.items()) if count))
+
+def to_listings(pages):
+    # API 페이지 목록 -> 조건의 현재 스냅샷 (Listing 목록)
+    snapshot = []
+    for page_no, items_list in pages:
+        METRICS.inc("items_total", len(items_list))
+        for item in items_list:
+            listing = from_api(item, page_no)
+            if listing is not None:
+                snapshot.append(listing)
+    return snapshot
+
+def evaluate_condition(storage, market, resolver, compiled, snapshot, price_model):
+    # 이전 스냅샷과 비교해 변경분만 DB에 반영하고 알림 후보로 사용
+    condition = compiled.name
+    if not market.loaded(condition):
+        market.load(condition, storage.load_listings(condition))
+    delta = market.apply(condition, snapshot)
+    print(f"[+] '{condition}' 변경분 - 신규 {len(delta.added)}, 삭제 {len(delta.removed)}, 가격 변동 {len(delta.changed)}")
+    record_history(price_model.history, condition, market.index(condition))
+    if not delta:
+        return
+    # 알림 처리가 끝난 뒤에만 변경분을 DB에 반영. 도중에 실패하면 메모리 상태를 버리고 다음 사이클에 DB(이전 상태)에서 다시 읽어
+    # 이번 변경분이 다시 신규로 잡히도록 함
+    try:
+        with METRICS.span("process_condition", condition=condition):
+            process_condition(storage, resolver, compiled, market.index(condition), delta.alert_candidates(), price_model)
+    except Exception:
+        market.forget(condition)
+        raise
+    try:
+        storage.write_delta(condition, delta)
+    except Exception as e:
+        print(f"[x] 데이터베이스 삽입 중 오류 발생: {e}")
+        log(traceback.format_exc())
+        # DB와 메모리 상태가 어긋나지 않도록 다음 사이클에 DB에서 다시 읽음 (알림 기록이 있어 중복 알림은 없음)
+        market.forget(condition)
+
+def release_undelivered(storage, crawler, market):
+    # 지난 사이클에 보내지 못한 알림은 알림 기록을 지우고, 1페이지가 그대로여도 다시 수집해서 알림 후보로 넘김
+    undelivered = notifier.take_undelivered()
+    if not undelivered:
+        return
+    print(f"[!] 전송하지 못한 알림 {len(undelivered)}건 - 이번 사이클에 다시 알림")
+    for condition, key, alert_id in undelivered:
+        storage.release_notified(alert_id)
+        market.retry(condition, key)
+        if crawler.probe:
+            crawler.probe.discard(condition)
+
+def collect_and_notify(storage, crawler, market, resolver, conditions, plans, names, price_model, groups=None, offload=None):
+    resolver.new_cycle()
+    started = time.perf_counter()
+    release_undelivered(storage, crawler, market)
+
+    def finish(condition, pages, converted=None):
+        # 한 조건의 오류로 이번 사이클의 나머지 조건 처리가 멈추지 않도록 조건 단위로 기록만 하고 넘어감
+        try:
+            # converted: offload 모드에서 변환 프로세스에 넘긴 작업 (없으면 여기서 변환)
+            snapshot = to_listings(pages) if converted is None else [from_row(row) for row in converted.result()]
+            evaluate_condition(storage, market, resolver, conditions[condition], snapshot, price_model)
+        except Exception as e:
+            print(f"[x] '{condition}' 조건 처리 중 오류 발생: {e}")
+            log(traceback.format_exc())
+            if crawler.probe:
+                crawler.probe.discard(condition)
+            return
+        if crawler.probe:
+            crawler.probe.commit(condition, pages)
+
+    # offload 모드: 응답 변환을 변환 프로세스 수만큼 미리 넘겨두고, 조건 순서대로 결과를 받아 비교/알림 처리
+    converting = deque()
+
+    # 조건/페이지 요청은 병렬로 수행하고, 한 조건의 수집이 끝나면 다른 조건을 기다리지 않고 바로 비교/알림 처리
+    # (변경분/최저가 판단에는 조건의 전체 스냅샷이 필요하므로 페이지가 아니라 조건 단위로 넘김)
+    stream = crawler.stream({name: conditions[name].query for name in names}, plans=plans, groups=groups,
+                            group_max_pages=config.get("coalesce_max_pages"), backlog=config.get("pipeline_backlog", 2))
+    try:
+        for condition, pages in stream:
+            if pages is None:
+                # 수집에 실패한 조건은 이전 상태를 그대로 유지
+                continue
+            if pages is UNCHANGED:
+                # 1페이지가 지난 사이클과 같으면 이전 상태를 그대로 쓰고 최저가 이력만 남김
+                record_history(price_model.history, condition, market.index(condition))
+                continue
+            METRICS.observe("condition_ready_seconds", time.perf_counter() - started)
+            if offload is None:
+                finish(condition, pages)
+                continue
+            METRICS.inc("items_total", sum(len(items_list) for _, items_list in pages))
+            converting.append((condition, pages, offload.submit_api(pages)))
+            if len(converting) >= offload.workers:
+                finish(*converting.popleft())
+        while converting:
+            finish(*converting.popleft())
+    finally:
+        # 처리 중 오류가 나도 수집 스레드를 여기서 멈춰서 다음 사이클 수집과 겹치지 않게 함
+        stream.close()
+
+    for key_stats in s.stats():
+        print(f"[+] API 키 {key_stats['key']} - 요청 {key_stats['requests']}회, 쿼터 초과 {key_stats['throttled']}회, 남은 쿼터 {key_stats['remaining']}")
+
+    print("[+] 데이터 수집 완료")
+
+    if crawler.probe:
+        probe_stats = crawler.probe.stats()
+        print(f"[+] 변경 확인 {probe_stats['probes']}회 - 건너뜀 {probe_stats['skipped']}회, 변경 {probe_stats['changed']}회, "
+              f"주기적 전체 수집 {probe_stats['forced']}회, 절약한 API 요청 {probe_stats['saved_requests']}회")
+
+    price_model.history.flush()
+
+    notified_stats = storage.notified.stats()
+    print(f"[+] 알림 기록 {notified_stats['size']}건 (중복 확인 {notified_stats['checks']}회, 적중률 {notified_stats['hit_rate']:.1%}, 만료 정리 {notified_stats['swept']}건)")
+
+    resolver_stats = resolver.stats()
+    print(f"[+] 사이트 검색 {resolver_stats['fetches']}회 (페이지 캐시 적중 {resolver_stats['page_hits']}회, ProductId 캐시 적중 {resolver_stats['resolved_hits']}회, 찾지 못한 매물 재검색 생략 {resolver_stats['missed_hits']}회)")
+
+def plan_groups(conditions):
+    # 옵션 카탈로그로 조건별 옵션을 로컬에서 확인할 수 있을 때만 검색을 묶음
+    try:
+        catalog = OptionCatalog.fetch(s, f"{api_base}/auctions/options")
+    except Exception as e:
+        print(f"[x] 옵션 카탈로그 조회 실패, 조건별로 검색합니다: {e}")
+        return []
+    groups, singles = plan_queries(conditions, catalog)
+    for group in groups:
+        print(f"[+] 묶음 검색: {group.name}")
+    print(f"[+] 조건 {len(conditions)}개 -> 묶음 검색 {len(groups)}개 + 단독 검색 {len(singles)}개")
+    return groups
+
+class Runtime:
+    # 데몬 모드에서 사이클 사이에 유지되는 상태 (DB 연결, 크롤러, 시장 상태, 검색 캐시)
+    # worker=True면 같은 DB를 쓰는 다른 워커와 lease로 조건을 나눠서 담당
+    def __init__(self, worker=False):
+        self.conditions = load_conditions()
+        self.intervals = {name: condition.settings["PollInterval"] for name, condition in self.conditions.items() if "PollInterval" in condition.settings}
+        self.storage = init_db(shared=worker)
+        # 조건별 최저가 이력과 알림 구간 모델 (config "price_model", 기본은 최저가 대비 alert_band)
+        model_config = config.get("price_model") or {}
+        window_hours = model_config.get("window_hours", 168)
+        self.history = PriceHistory(self.storage.conn, retention_ms=int(window_hours * 3600 * 1000))
+        self.history.init_schema()
+        self.price_model = PriceModel.from_config(self.history, model_config, alert_band)
+        self.plans = {name: build_page_plan(condition.settings, self.price_model.page_band) for name, condition in self.conditions.items()}
+        # 1페이지가 지난 사이클과 같은 조건은 나머지 페이지 수집과 비교/알림을 건너뜀 (config "change_probe")
+        probe = ChangeProbe(config.get("probe_max_skips", DEFAULT_MAX_SKIPS)) if config.get("change_probe", True) else None
+        self.crawler = Crawler(s, concurrency=config.get("concurrency", 4), api_url=f"{api_base}/auctions/items", probe=probe)
+        self.market = MarketState()
+        # 사이트 HTML 파싱과 API 응답 변환을 별도 프로세스에서 실행 (config "offload_workers", 0이면 메인 프로세스에서)
+        self.offload = Offload(config["offload_workers"], config.get("parser", "auto")) if config.get("offload_workers") else None
+        if self.offload:
+            self.offload.start()
+        self.resolver = ProductResolver(lambda infos: search_item(generate_query_params(infos)), parse_auction_items,
+                                        page_ttl=config.get("search_cache_ttl", 30), offload=self.offload)
+        self.groups = plan_groups(self.conditions) if config.get("coalesce_queries", False) else []
+        self.profiler = None
+        self.leases = None
+        if worker:
+            store = LeaseStore(normalize_path(config.get("lease_db", f"{current_dir}/leases.db")), ttl=config.get("lease_ttl", DEFAULT_LEASE_TTL))
+            store.init_schema(self.conditions)
+            self.leases = LeaseKeeper(store, self.conditions)
+            self.leases.start()
+
+    def forget(self, condition):
+        # 다른 워커가 담당하던 동안 바뀐 상태는 DB에서 다시 읽도록 조건별 메모리 상태를 비움
+        self.market.forget(condition)
+        self.history.forget(condition)
+        self.storage.reload_lowest_price(condition)
+        if self.crawler.probe:
+            self.crawler.probe.discard(condition)
+
+    def run_cycle(self, names):
+        if self.leases:
+            owned, acquired = self.leases.take()
+            for condition in acquired:
+                self.forget(condition)
+            names = [name for name in names if name in owned]
+            if not names:
+                return
+        args = (self.storage, self.crawler, self.market, self.resolver, self.conditions, self.plans, names, self.price_model, self.groups,
+                self.offload)
+        if self.profiler:
+            self.profiler.run(run_cycle, *args)
+        else:
+            run_cycle(*args)
+
+    def close(self):
+        self.crawler.close()
+        if self.offload:
+            self.offload.close()
+        self.history.flush()
+        if self.leases:
+            # 담당 조건을 바로 내놓아서 다른 워커가 lease 만료를 기다리지 않게 함
+            self.leases.close()
+        # 데이터베이스 연결 종료
+        self.storage.close()
+
+# 죽은 워커를 다시 띄우기 전 대기 시간(초)
+WORKER_RESTART_DELAY = 5.0
+
+def coordinate(count, interval):
+    # --workers N: 워커 프로세스 N개를 띄우고 죽은 워커는 다시 띄움
+    # 조건 배분은 워커끼리 lease 저장소로 하므로, 같은 DB/lease 파일을 쓰는 --worker 프로세스를 따로 띄워도 함께 참여함
+    # DB/lease 스키마 확인은 워커를 띄우기 전에 한 번만
+    init_db().close()
+    store = LeaseStore(normalize_path(config.get("lease_db", f"{current_dir}/leases.db")))
+    store.init_schema(load_conditions())
+    store.close()
+
+    stopped = []
+    signal.signal(signal.SIGINT, lambda *args: stopped.append(True))
+    signal.signal(signal.SIGTERM, lambda *args: stopped.append(True))
+
+    procs = {}
+    restart_at = {}
+
+    def spawn(index):
+        env = dict(os.environ, LOSTARK_NOTI_WORKER=f"{index}/{count}")
+        procs[index] = subprocess.Popen([sys.executable, current_file_path, "--worker", "--interval", str(interval)], env=env)
+        print(f"[+] {datetime.now(KST)} - 워커 {index} 시작 (pid {procs[index].pid})")
+
+    for index in range(count):
+        spawn(index)
+    while not stopped:
+        time.sleep(1.0)
+        now = time.monotonic()
+        for index, proc in procs.items():
+            if proc.poll() is not None and index not in restart_at:
+                # 죽은 워커의 조건은 lease가 만료되면 다른 워커가 가져가고, 다시 띄운 워커는 새 워커로 참여
+                print(f"[x] {datetime.now(KST)} - 워커 {index} 종료 (exit {proc.returncode}), {WORKER_RESTART_DELAY:.0f}초 뒤 다시 시작")
+                restart_at[index] = now + WORKER_RESTART_DELAY
+        for index, at in list(restart_at.items()):
+            if at <= now:
+                del restart_at[index]
+                spawn(index)
+
+    for proc in procs.values():
+        if proc.poll() is None:
+            proc.terminate()
+    for index, proc in procs.items():
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            print(f"[x] 워커 {index} 강제 종료")
+            proc.kill()
+    print(f"[{datetime.now(KST)}] 코디네이터 종료")
+
+def main():
+    parser = argparse.ArgumentParser(description="lostark auction notifier")
+    parser.add_argument("--daemon", action="store_true", help="한 번 실행하고 종료하지 않고 주기적으로 사이클 반복")
+    parser.add_argument("--interval", type=float, default=config.get("interval", 60), help="기본 폴링 주기(초)")
+    parser.add_argument("--record", metavar="PATH", help="API/사이트/웹훅 요청과 응답을 JSON lines로 녹화 (replay.py로 재생)")
+    parser.add_argument("--profile", metavar="DIR", help="사이클을 프로파일링해서 pstats/collapsed stack 파일을 DIR에 저장")
+    parser.add_argument("--profile-every", type=int, default=1, metavar="N", help="N번째 사이클마다 한 번만 프로파일링 (데몬 모드)")
+    parser.add_argument("--profile-memory", action="store_true", help="파싱/DB 반영 단계의 tracemalloc 할당 상위 목록도 저장")
+    parser.add_argument("--profile-top", type=int, default=20, help="메모리 할당 위치를 단계별로 몇 개까지 남길지")
+    parser.add_argument("--workers", type=int, metavar="N", help="코디네이터 모드: 워커 프로세스 N개에 조건을 나눠서 실행")
+    parser.add_argument("--worker", action="store_true", help="워커 모드: lease 저장소(config \"lease_db\")로 다른 워커와 조건을 나눠서 데몬 실행")
+    args = parser.parse_args()
+
+    if args.workers:
+        coordinate(args.workers, args.interval)
+        return
+
+    # 단계별 소요 시간/카운터: config "metrics_log"에 JSON lines, "metrics_port"에 Prometheus 텍스트 엔드포인트
+    # 코디네이터가 띄운 워커는 워커 번호만큼 포트를 올리고 로그 파일도 워커별로 씀
+    worker_index = int(worker_slot.split("/")[0]) if worker_slot else 0
+    metrics_log = config.get("metrics_log")
+    if metrics_log and worker_slot:
+        root, ext = os.path.splitext(metrics_log)
+        metrics_log = f"{root}.{worker_index}{ext}"
+    METRICS.configure(log_path=metrics_log)
+    if config.get("metrics_port"):
+        METRICS.serve(int(config["metrics_port"]) + worker_index, config.get("metrics_host", "127.0.0.1"))
+
+    if args.record:
+        install_recorder(args.record, [key.session for key in s.keys] + [site_session, notifier.session])
+
+    runtime = Runtime(worker=args.worker)
+    if args.profile:
+        runtime.profiler = CycleProfiler(args.profile, every=args.profile_every, memory=args.profile_memory, top=args.profile_top)
+    notifier.start()
+    try:
+        if args.daemon or args.worker:
+            # 세션, DB 연결, 조건을 유지한 채로 주기적으로 사이클 실행
+            scheduler = Scheduler(runtime.conditions, args.interval, runtime.intervals)
+            scheduler.run_forever(runtime.run_cycle)
+        else:
+            runtime.run_cycle(list(runtime.conditions))
+    finally:
+        notifier.close()
+        runtime.close()
+        METRICS.close()
+    print(f"[{datetime.now(KST)}] 프로그램 실행 완료")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import signal
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+
+# KST 시간대 정의
+KST = timezone(timedelta(hours=9))
+
+
+class Scheduler:
+    def __init__(self, names, default_interval, intervals=None):
+        # 조건별 폴링 주기(초). 지정되지 않은 조건은 default_interval 사용
+        intervals = intervals or {}
+        self.intervals = {name: float(intervals.get(name, default_interval)) for name in names}
+        self.next_due = {name: 0.0 for name in names}
+        self.stopped = False
+
+    def due(self, now):
+        return [name for name, due_at in self.next_due.items() if due_at <= now]
+
+    def mark(self, names, started):
+        # 사이클 시작 시점을 기준으로 다음 실행 시각을 잡아 주기가 밀리지 않도록 함
+        for name in names:
+            self.next_due[name] = started + self.intervals[name]
+
+    def sleep_time(self, now):
+        return max(0.0, min(self.next_due.values()) - now)
+
+    def stop(self, *args):
+        self.stopped = True
+
+    def run_forever(self, run_cycle):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        print(f"[+] {datetime.now(KST)} - 데몬 모드 시작 (조건 {len(self.intervals)}개)")
+
+        cycle = 0
+        while not self.stopped:
+            now = time.monotonic()
+            names = self.due(now)
+            if names:
+                cycle += 1
+                try:
+                    run_cycle(names)
+                except Exception as e:
+                    # 한 사이클의 오류로 데몬이 죽지 않도록 기록만 하고 다음 사이클 진행
+                    print(f"[x] {cycle}번째 사이클 실행 중 오류 발생: {e}")
+                    print(traceback.format_exc())
+                self.mark(names, now)
+                print(f"[+] {datetime.now(KST)} - {cycle}번째 사이클 완료 ({len(names)}개 조건, {time.monotonic() - now:.2f}초)")
+
+            # 종료 신호에 바로 반응할 수 있도록 최대 1초 단위로 나눠서 대기
+            wait = self.sleep_time(time.monotonic())
+            while wait > 0 and not self.stopped:
+                time.sleep(min(wait, 1.0))
+                wait -= 1.0
+
+        print(f"[+] {datetime.now(KST)} - 데몬 모드 종료")
@@ -0,0 +1,126 @@
+import json
+import time
+from collections import OrderedDict
+
+from listing import from_auction
+from matching import MatchIndex
+from metrics import METRICS
+
+# 사이트 검색 결과 한 페이지의 매물 수
+SITE_PAGE_SIZE = 10
+
+
+class TTLCache:
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.data[key]
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.data[key] = (time.monotonic() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+def normalize_query(infos):
+    # 키 순서와 상관없이 같은 검색 조건이면 같은 캐시 키가 되도록 정렬해서 직렬화
+    return json.dumps(infos, sort_keys=True, ensure_ascii=False)
+
+
+class ProductResolver:
+    def __init__(self, fetch, parse, page_ttl=30.0, maxsize=256, offload=None):
+        self.fetch = fetch  # infos -> html
+        self.parse = parse  # html -> 사이트 검색 결과 아이템 목록
+        self.offload = offload  # 설정 시 파싱/fingerprint 계산을 변환 프로세스에서 실행
+        # 검색 결과 페이지는 사이클 단위로만 재사용, ProductId는 매물이 내려가기 전까지 유효
+        self.pages = TTLCache(maxsize=maxsize, ttl=page_ttl)
+        self.resolved = TTLCache(maxsize=maxsize * 16, ttl=24 * 3600)
+        self.fetches = 0
+        # 이번 사이클에 찾지 못한 매물 (같은 사이클 안에서는 다시 검색하지 않음)
+        self.missed = set()
+        self.misses = 0
+
+    def new_cycle(self):
+        self.pages.clear()
+        self.missed.clear()
+
+    def page(self, infos):
+        key = normalize_query(infos)
+        index = self.pages.get(key)
+        if index is None:
+            self.fetches += 1
+            # 페이지를 한 번 파싱하면 fingerprint 색인까지 만들어서 캐시
+            html = self.fetch(infos)
+            with METRICS.span("parse_auction_items"):
+                if self.offload:
+                    listings = self.offload.site_listings(html)
+                else:
+                    listings = [from_auction(result) for result in self.parse(html)]
+                index = MatchIndex(listings)
+            self.pages.set(key, index)
+        return index
+
+    def queries(self, item, condition):
+        # 이름/품질을 뺀 넓은 검색 한 번으로 같은 조건의 여러 아이템을 함께 찾고,
+        # 찾지 못하면 기존처럼 아이템별 검색으로 확인
+        page_no = item.page_no or 1
+        infos = condition.site_query(item.name, page_no, item.grade_quality)
+        if condition.min_quality is not None:
+            broad = condition.site_query("", page_no, condition.min_quality)
+            if broad != infos:
+                yield broad, True
+        yield infos, False
+
+    def resolve(self, item, condition):
+        key = item.key
+        product_id = self.resolved.get(key)
+        if product_id is not None:
+            return product_id
+        if key in self.missed:
+            self.misses += 1
+            return None
+
+        for query, broad in self.queries(item, condition):
+            index = self.page(query)
+            with METRICS.span("items_match"):
+                result = index.find(item)
+            if result is not None:
+                self.resolved.set(key, result.product_id)
+                return result.product_id
+            if broad and len(index) < SITE_PAGE_SIZE:
+                # 넓은 검색 결과가 이 페이지에서 끝났으면 아이템별 검색 결과도 모두 이 안에 있으므로 다시 검색하지 않음
+                break
+        self.missed.add(key)
+        return None
+
+    def stats(self):
+        return {
+            "fetches": self.fetches,
+            "page_hits": self.pages.hits,
+            "page_misses": self.pages.misses,
+            "resolved_hits": self.resolved.hits,
+            "missed_hits": self.misses,
+        }
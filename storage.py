@@ -0,0 +1,177 @@
+import sqlite3
+
+from dedupe import LEGACY_TTL_MS, NotifiedStore, now_ms
+from listing import OPTIONS, Listing, parse_end_ms
+from metrics import METRICS
+
+ITEM_COLUMNS = ('itemName', 'optionInfo', 'endDate', 'price', 'tradeAllowCount', 'gradeQuality', 'icon', 'pageNo', 'startPrice', 'bidPrice', 'buyPrice')
+
+# WAL 모드 + 동기화 완화: 크래시 시 마지막 트랜잭션 정도만 잃을 수 있고 쓰기 지연은 크게 줄어듦
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+# 테이블에 컬럼이 있는지 확인하고 없으면 추가
+def add_column_if_not_exists(cursor, table_name, column_name, column_type):
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = [column[1] for column in cursor.fetchall()]
+    if column_name not in columns:
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+        print(f"[+] '{column_name}' 컬럼이 '{table_name}' 테이블에 추가되었습니다.")
+
+
+def listing_row(item):
+    # Listing -> ITEM_COLUMNS 순서의 행
+    return (item.name, item.option_info, item.end_text, item.price, item.trade_count, item.grade_quality, item.icon,
+            item.page_no, item.start_price, item.bid_price, item.price)
+
+
+class Storage:
+    def __init__(self, path, shared=False):
+        self.conn = sqlite3.connect(path)
+        self.cursor = self.conn.cursor()
+        for pragma in PRAGMAS:
+            self.cursor.execute(pragma)
+        # shared: 여러 워커 프로세스가 같은 DB를 씀 (알림 기록은 DB에서 바로 선점, 쓰기 잠금은 더 오래 기다림)
+        self.shared = shared
+        if shared:
+            self.cursor.execute("PRAGMA busy_timeout=30000")
+        self.notified = NotifiedStore(self.conn)
+        # 조건별 알림 기준 최저가 (DB는 재시작 시 복원용, 조회는 메모리에서)
+        self.lowest_prices = None
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def init_schema(self):
+        cursor = self.cursor
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS items (
+            condition_name TEXT,
+            itemName TEXT,
+            optionInfo TEXT,
+            endDate TEXT,
+            price REAL,
+            tradeAllowCount INTEGER,
+            gradeQuality INTEGER,
+            icon TEXT
+        )
+        ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS lowest_prices (
+            condition_name TEXT PRIMARY KEY,
+            lowest_price REAL
+        )
+        ''')
+
+        # 이미 알림을 보낸 아이템을 추적하기 위한 테이블 생성
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notified_items (
+            item_id TEXT PRIMARY KEY
+        )
+        ''')
+
+        # 테이블 수정
+        add_column_if_not_exists(cursor, 'items', 'infos', 'TEXT')
+        add_column_if_not_exists(cursor, 'items', 'startPrice', 'REAL')
+        add_column_if_not_exists(cursor, 'items', 'bidPrice', 'REAL')
+        add_column_if_not_exists(cursor, 'items', 'buyPrice', 'REAL')
+        add_column_if_not_exists(cursor, 'items', 'listing_key', 'TEXT')
+        add_column_if_not_exists(cursor, 'items', 'pageNo', 'INTEGER')
+        add_column_if_not_exists(cursor, 'notified_items', 'expires_at', 'INTEGER')
+
+        # 만료 시간이 없던 이전 알림 기록은 일정 기간 뒤 정리되도록 만료 시간 부여
+        cursor.execute('UPDATE notified_items SET expires_at = ? WHERE expires_at IS NULL', (now_ms() + LEGACY_TTL_MS,))
+
+        # 사이트 검색 폼은 조건에서 만들므로 이전 버전이 행마다 저장하던 infos JSON은 페이지 번호만 남기고 비움
+        try:
+            cursor.execute("UPDATE items SET pageNo = json_extract(infos, '$.pageNo'), infos = NULL WHERE infos IS NOT NULL")
+        except sqlite3.OperationalError:
+            cursor.execute("UPDATE items SET infos = NULL WHERE infos IS NOT NULL")
+
+        # 매물 식별자가 없는 이전 버전의 스냅샷은 다음 수집에서 다시 채워지도록 제거
+        cursor.execute('DELETE FROM items WHERE listing_key IS NULL')
+
+        # 조건별 조회/변경분 반영, 만료 정리, 가격 정렬에 쓰이는 인덱스
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_condition_key ON items (condition_name, listing_key)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_condition_price ON items (condition_name, price)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_items_endDate ON items (endDate)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_notified_expires ON notified_items (expires_at)')
+
+        self.conn.commit()
+
+        # 알림 기록은 메모리에 올려두고 조회 (만료된 기록은 로드 전에 정리)
+        self.notified.load()
+
+    def load_listings(self, condition):
+        self.cursor.execute('''
+        SELECT listing_key, itemName, optionInfo, endDate, price, tradeAllowCount, gradeQuality, icon, pageNo, startPrice, bidPrice
+        FROM items WHERE condition_name = ?
+        ''', (condition,))
+        listings = []
+        for key, name, option_info, end_text, price, trade_count, quality, icon, page_no, start_price, bid_price in self.cursor.fetchall():
+            options = tuple(OPTIONS.intern_text(line) for line in (option_info or '').split('\n') if line.strip())
+            listings.append(Listing(name, quality, trade_count, options, parse_end_ms(end_text), price, start_price=start_price,
+                                    bid_price=bid_price, icon=icon, page_no=page_no, key=key))
+        return listings
+
+    def write_delta(self, condition, delta):
+        # 한 조건의 변경분을 executemany로 묶어서 하나의 트랜잭션으로 반영
+        with METRICS.span("db_write", condition=condition, added=len(delta.added), changed=len(delta.changed),
+                          removed=len(delta.removed)), self.conn:
+            if delta.added:
+                self.conn.executemany(f'''
+                INSERT INTO items (condition_name, listing_key, {', '.join(ITEM_COLUMNS)})
+                VALUES (?, ?, {', '.join('?' * len(ITEM_COLUMNS))})
+                ''', [(condition, key) + listing_row(item) for key, item in delta.added.items()])
+            if delta.changed:
+                self.conn.executemany('''
+                UPDATE items SET price = ?, startPrice = ?, bidPrice = ?, buyPrice = ?
+                WHERE condition_name = ? AND listing_key = ?
+                ''', [(item.price, item.start_price, item.bid_price, item.price, condition, key) for key, item in delta.changed.items()])
+            if delta.removed:
+                self.conn.executemany('DELETE FROM items WHERE condition_name = ? AND listing_key = ?',
+                                      [(condition, key) for key in delta.removed])
+
+    def get_lowest_price(self, condition):
+        if self.lowest_prices is None:
+            self.lowest_prices = dict(self.conn.execute('SELECT condition_name, lowest_price FROM lowest_prices'))
+        return self.lowest_prices.get(condition)
+
+    def set_lowest_price(self, condition, price):
+        if self.lowest_prices is not None:
+            self.lowest_prices[condition] = price
+        with self.conn:
+            self.conn.execute('''
+            INSERT OR REPLACE INTO lowest_prices (condition_name, lowest_price)
+            VALUES (?, ?)
+            ''', (condition, price))
+
+    def reload_lowest_price(self, condition):
+        # 다른 워커가 담당하던 조건을 넘겨받으면 그 워커가 갱신한 최저가를 다시 읽음
+        if self.lowest_prices is not None:
+            row = self.conn.execute('SELECT lowest_price FROM lowest_prices WHERE condition_name = ?', (condition,)).fetchone()
+            self.lowest_prices[condition] = row[0] if row else None
+
+    def claim_notified(self, item_id, end_ms=None):
+        # 알림을 보내기 전에 기록을 선점. 이미 알림을 보낸 매물이면 False
+        if self.shared:
+            # 다른 조건/워커가 같은 매물을 동시에 알리지 않도록 DB에서 바로 선점
+            return self.notified.claim(item_id, end_ms)
+        if item_id in self.notified:
+            return False
+        self.notified.add(item_id, end_ms)
+        return True
+
+    def release_notified(self, item_id):
+        self.notified.release(item_id)
+
+    def flush(self):
+        self.notified.flush()